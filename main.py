@@ -4,13 +4,16 @@ import os
 import sys
 import tempfile  # Для создания временного файла блокировки
 import socket  # Для получения имени хоста
+from typing import Any, Dict, Optional
 from aiogram import Bot, Dispatcher, F
 from aiogram.types import Message
 from aiogram.filters import Command
 from aiogram.fsm.storage.mongo import MongoStorage
+from aiogram.fsm.storage.base import StorageKey
 from dotenv import load_dotenv
 from aiogram.types import BufferedInputFile
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from motor.motor_asyncio import AsyncIOMotorClient
 from communication_handler import communication_handler_router
@@ -242,21 +245,82 @@ except ImportError as e:
 
     railway_print("Аварийная загрузка базовых модулей выполнена", "WARNING")
 
+class ProjectedMongoStorage(MongoStorage):
+    """
+    MongoStorage, который читает из документа только нужное поле.
+
+    FSM-middleware запрашивает состояние на каждое обновление, а стандартный
+    get_state забирает весь документ вместе с данными (профиль, история советов).
+    Проекция оставляет в ответе только короткую строку состояния.
+    """
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        document = await self._collection.find_one(
+            {"_id": self._key_builder.build(key)},
+            projection={"_id": 0, "state": 1}
+        )
+        if document is None:
+            return None
+        return document.get("state")
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        document = await self._collection.find_one(
+            {"_id": self._key_builder.build(key)},
+            projection={"_id": 0, "data": 1}
+        )
+        if document is None or not document.get("data"):
+            return {}
+        return document["data"]
+
 # Подключения к MongoDB
 MONGO_URL = os.getenv("MONGO_URL")
 DB_NAME = os.getenv("MONGO_DB_NAME", "aiogram_fsm_db")
 mongo_client = AsyncIOMotorClient(MONGO_URL)
 
+# Одна HTTP-сессия на процесс: соединения с api.telegram.org переиспользуются
+# между обработчиками, и TLS-рукопожатие не повторяется на каждый запрос
+TELEGRAM_CONNECTIONS_LIMIT = int(os.getenv("TELEGRAM_CONNECTIONS_LIMIT", "200"))
+TELEGRAM_KEEPALIVE_TIMEOUT = 75  # секунд простоя, после которых соединение закрывается
+
+
+class KeepAliveAiohttpSession(AiohttpSession):
+    """
+    AiohttpSession с увеличенным keepalive_timeout у TCPConnector.
+
+    Конструктор AiohttpSession в aiogram 3.20 принимает только limit, а
+    остальные параметры коннектора хранит в приватном словаре _connector_init,
+    из которого коннектор создается при первом запросе. Если после обновления
+    aiogram этого словаря не окажется, запуск остановится с ошибкой, а не
+    продолжится молча без настройки.
+    """
+
+    def __init__(self, keepalive_timeout: float, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        connector_init = getattr(self, "_connector_init", None)
+        if not isinstance(connector_init, dict) or "limit" not in connector_init:
+            raise RuntimeError(
+                "AiohttpSession больше не хранит настройки коннектора в _connector_init; "
+                "проверьте KeepAliveAiohttpSession после обновления aiogram"
+            )
+        connector_init["keepalive_timeout"] = keepalive_timeout
+
+
+bot_session = KeepAliveAiohttpSession(
+    keepalive_timeout=TELEGRAM_KEEPALIVE_TIMEOUT,
+    limit=TELEGRAM_CONNECTIONS_LIMIT
+)
+
 # Создаем экземпляр бота и диспетчер
 bot = Bot(
     token=BOT_TOKEN,
+    session=bot_session,
     default=DefaultBotProperties(
         parse_mode=ParseMode.HTML,  # Устанавливаем HTML-разметку по умолчанию
         link_preview_is_disabled=True,  # Отключаем предпросмотр веб-страниц
         protect_content=False  # Разрешаем пересылку сообщений
     )
 )
-dp = Dispatcher(storage=MongoStorage(
+dp = Dispatcher(storage=ProjectedMongoStorage(
     client=mongo_client,
     db_name=DB_NAME
 ))
@@ -1,4 +1,5 @@
 from typing import Dict, List, Union, Tuple, Any, Optional
+from dataclasses import dataclass
 import logging
 
 # Настройка логирования
@@ -33,6 +34,29 @@ DEMO_QUESTIONS = [
     }
 ]
 
+@dataclass(frozen=True, slots=True)
+class VasiniQ:
+    """
+    Неизменяемый вопрос теста Vasini.
+    
+    Поля читаются как атрибуты (q.text); доступ по ключу (q["text"])
+    сохранен для кода, который работает с вопросами как со словарями.
+    """
+    id: str
+    text: str
+    type: str
+    options: Dict[str, str]
+    interpretations: Dict[str, str]
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
 # Тест 2.0 - 34 вопроса из файла test2.0 с вариантами ответов и интерпретациями
 VASINI_QUESTIONS = [
     {
@@ -616,6 +640,9 @@ VASINI_QUESTIONS = [
     # Добавьте остальные вопросы из test2.0 здесь
 ]
 
+# Вопросы хранятся как кортеж неизменяемых объектов
+VASINI_QUESTIONS: Tuple[VasiniQ, ...] = tuple(VasiniQ(**question) for question in VASINI_QUESTIONS)
+
 # Функции для получения вопросов
 def get_demo_questions() -> List[Dict[str, Union[str, List[str]]]]:
     """
@@ -626,16 +653,16 @@ def get_demo_questions() -> List[Dict[str, Union[str, List[str]]]]:
     """
     return DEMO_QUESTIONS
 
-def get_all_vasini_questions() -> List[Dict[str, Union[str, Dict[str, str]]]]:
+def get_all_vasini_questions() -> Tuple[VasiniQ, ...]:
     """
     Получение полного списка вопросов Vasini.
     
     Returns:
-        List[Dict]: Полный список вопросов Vasini.
+        Tuple[VasiniQ, ...]: Полный список вопросов Vasini.
     """
     return VASINI_QUESTIONS
 
-def get_question_by_id(question_id: str) -> Dict[str, Union[str, Dict[str, str]]]:
+def get_question_by_id(question_id: str) -> Union[Dict[str, str], VasiniQ]:
     """
     Получение вопроса по его ID.
     
@@ -643,25 +670,108 @@ def get_question_by_id(question_id: str) -> Dict[str, Union[str, Dict[str, str]]
         question_id: ID вопроса.
         
     Returns:
-        Dict: Данные вопроса или пустой словарь, если вопрос не найден.
+        Union[Dict, VasiniQ]: Данные вопроса или пустой словарь, если вопрос не найден.
+    """
+    # Ищем вопрос по ID в индексе, построенном при загрузке модуля;
+    # если вопрос не найден, возвращаем пустой словарь
+    return _QUESTIONS_BY_ID.get(question_id, {})
+
+# Индекс вопросов по ID: каталог вопросов не меняется во время работы бота,
+# поэтому демо-вопросы и вопросы Vasini объединяются один раз, а не при каждом поиске.
+# При совпадении ID побеждает первый вопрос, как при последовательном поиске
+_QUESTIONS_BY_ID: Dict[str, Union[Dict[str, str], VasiniQ]] = {}
+for _question in (*DEMO_QUESTIONS, *get_all_vasini_questions()):
+    _QUESTIONS_BY_ID.setdefault(_question["id"], _question)
+del _question
+
+# Компактное хранение ответов в состоянии FSM во время опроса:
+# ответы на вопросы Vasini хранятся по одному байту на вопрос (0-3 соответствуют A-D),
+# ответы на демо-вопросы остаются словарем, так как это произвольный текст
+VASINI_OPTIONS = ("A", "B", "C", "D")
+VASINI_OPTION_CODES = {option: code for code, option in enumerate(VASINI_OPTIONS)}
+VASINI_UNANSWERED = 0xFF
+
+def is_packed_answers(answers: Any) -> bool:
     """
-    # Объединяем демо-вопросы и все вопросы Vasini
-    all_questions = DEMO_QUESTIONS + get_all_vasini_questions()
+    Проверяет, хранятся ли ответы в компактном формате.
     
-    # Ищем вопрос по ID
-    for question in all_questions:
-        if question["id"] == question_id:
-            return question
+    Args:
+        answers: Ответы пользователя
+        
+    Returns:
+        bool: True, если ответы имеют вид {"v": ..., "demo": ...}
+    """
+    return isinstance(answers, dict) and "v" in answers and "demo" in answers
+
+def pack_answers(demo_answers: Dict[str, str], vasini_answers: bytearray) -> Dict[str, Any]:
+    """
+    Упаковывает ответы в компактный формат для хранения в состоянии FSM.
     
-    # Если вопрос не найден, возвращаем пустой словарь
-    return {}
+    Args:
+        demo_answers: Ответы на демо-вопросы
+        vasini_answers: Буфер ответов на вопросы Vasini (по байту на вопрос)
+        
+    Returns:
+        Dict[str, Any]: Ответы в формате {"v": hex-строка, "demo": словарь}
+    """
+    return {"v": bytes(vasini_answers).hex(), "demo": demo_answers}
+
+def unpack_answers(answers: Optional[Dict[str, Any]]) -> Tuple[Dict[str, str], bytearray]:
+    """
+    Распаковывает ответы из компактного или старого словарного формата.
+    
+    Args:
+        answers: Ответы пользователя в любом из форматов
+        
+    Returns:
+        Tuple[Dict[str, str], bytearray]: Ответы на демо-вопросы и буфер ответов на вопросы Vasini
+    """
+    vasini_answers = bytearray([VASINI_UNANSWERED]) * len(VASINI_QUESTIONS)
+    if not answers:
+        return {}, vasini_answers
+    
+    if is_packed_answers(answers):
+        packed = bytes.fromhex(answers["v"])
+        vasini_answers[:len(packed)] = packed[:len(vasini_answers)]
+        return dict(answers["demo"]), vasini_answers
+    
+    # Старый формат: {question_id: ответ} для всех вопросов
+    demo_answers = {}
+    question_positions = {question.id: i for i, question in enumerate(VASINI_QUESTIONS)}
+    for question_id, answer in answers.items():
+        position = question_positions.get(question_id)
+        if position is None:
+            demo_answers[question_id] = answer
+        elif answer in VASINI_OPTION_CODES:
+            vasini_answers[position] = VASINI_OPTION_CODES[answer]
+    return demo_answers, vasini_answers
+
+def answers_to_dict(answers: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Преобразует ответы в словарь {question_id: ответ}.
+    
+    Args:
+        answers: Ответы пользователя в компактном или словарном формате
+        
+    Returns:
+        Dict[str, str]: Словарь с ответами на все вопросы
+    """
+    if not is_packed_answers(answers):
+        return dict(answers or {})
+    
+    demo_answers, vasini_answers = unpack_answers(answers)
+    result = dict(demo_answers)
+    for question, code in zip(VASINI_QUESTIONS, vasini_answers):
+        if code < len(VASINI_OPTIONS):
+            result[question.id] = VASINI_OPTIONS[code]
+    return result
 
 def get_personality_type_from_answers(answers: Dict[str, Any]) -> Tuple[Dict[str, int], str, Optional[str]]:
     """
     Определяет тип личности по ответам на вопросы Vasini.
     
     Args:
-        answers: Словарь с ответами пользователя
+        answers: Словарь с ответами пользователя (в словарном или компактном формате)
     
     Returns:
         Tuple[Dict[str, int], str, Optional[str]]: Кортеж с количеством ответов каждого типа, 
@@ -676,12 +786,19 @@ def get_personality_type_from_answers(answers: Dict[str, Any]) -> Tuple[Dict[str
     }
     
     # Подсчитываем количество ответов каждого типа
-    vasini_count = 0
-    for question_id, answer in answers.items():
-        # Проверяем, что это вопрос Vasini (начинается с 'vasini_')
-        if question_id.startswith('vasini_') and answer in ["A", "B", "C", "D"]:
-            type_counts[answer] += 1
-            vasini_count += 1
+    if is_packed_answers(answers):
+        # В компактном формате считаем коды вариантов прямо в буфере ответов
+        _, vasini_answers = unpack_answers(answers)
+        for option, code in VASINI_OPTION_CODES.items():
+            type_counts[option] = vasini_answers.count(code)
+        vasini_count = sum(type_counts.values())
+    else:
+        vasini_count = 0
+        for question_id, answer in answers.items():
+            # Проверяем, что это вопрос Vasini (начинается с 'vasini_')
+            if question_id.startswith('vasini_') and answer in VASINI_OPTION_CODES:
+                type_counts[answer] += 1
+                vasini_count += 1
     
     # Логируем информацию о подсчете
     logger.info(f"Подсчитано {vasini_count} ответов на вопросы Vasini")
@@ -691,8 +808,8 @@ def get_personality_type_from_answers(answers: Dict[str, Any]) -> Tuple[Dict[str
     # Проверяем наличие ответов в другом формате
     if sum(type_counts.values()) == 0:
         logger.warning("Не найдены ответы в стандартном формате, пробуем альтернативный формат")
-        for key, value in answers.items():
-            if isinstance(value, str) and value.upper() in ["A", "B", "C", "D"]:
+        for key, value in answers_to_dict(answers).items():
+            if isinstance(value, str) and value.upper() in VASINI_OPTION_CODES:
                 type_counts[value.upper()] += 1
     
     # Находим тип с наибольшим количеством ответов
@@ -1,13 +1,27 @@
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Tuple, Optional, Union
+import math
+import random
+import re
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Optional, Union, Callable, Awaitable, Deque
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, MessageEntity
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
+from aiogram.utils.chat_action import ChatActionSender
 
 from button_states import SurveyStates, ProfileStates
 from profile_generator import generate_profile, save_profile_to_db
+from questions import (
+    get_demo_questions, get_all_vasini_questions, get_personality_type_from_answers,
+    VASINI_OPTION_CODES, pack_answers, unpack_answers, answers_to_dict, VasiniQ
+)
 
 # Импорт функции railway_print для логирования
 try:
@@ -32,22 +46,390 @@ logger = logging.getLogger(__name__)
 # Создаем роутер для опроса
 survey_router = Router()
 
+# Загружаем списки вопросов один раз при импорте модуля
+_DEMO_QUESTIONS = tuple(get_demo_questions())
+try:
+    _VASINI_QUESTIONS = tuple(get_all_vasini_questions())
+    logger.info(f"Загружено {len(_VASINI_QUESTIONS)} вопросов Vasini")
+except Exception as e:
+    logger.error(f"Ошибка при загрузке вопросов Vasini: {e}")
+    # Используем пустой список в случае ошибки
+    _VASINI_QUESTIONS = ()
+    railway_print("ОШИБКА: Не удалось загрузить вопросы Vasini, опрос будет недоступен", "ERROR")
+
+# Количество вопросов не меняется во время работы бота
+_DEMO_LEN = len(_DEMO_QUESTIONS)
+_VASINI_LEN = len(_VASINI_QUESTIONS)
+
+# Готовые тексты интерпретаций для каждой пары (вопрос, вариант ответа)
+_INTERPRETATION_MSGS: Dict[Tuple[str, str], str] = {
+    (question.id, option): f"💡 <b>Интерпретация:</b>\n\n{text}"
+    for question in _VASINI_QUESTIONS
+    for option, text in question.interpretations.items()
+}
+
+def _build_vasini_keyboard(question: VasiniQ) -> ReplyKeyboardMarkup:
+    """
+    Создает клавиатуру с вариантами ответов на вопрос Vasini.
+    
+    Args:
+        question: Вопрос Vasini с вариантами ответов
+        
+    Returns:
+        ReplyKeyboardMarkup: Клавиатура с вариантами ответов и кнопкой отмены
+    """
+    # Формируем текст кнопки с более выраженной буквой варианта
+    keyboard = [[KeyboardButton(text=f"{option}: {text}")] for option, text in question.options.items()]
+    keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
+    return ReplyKeyboardMarkup(
+        keyboard=keyboard,
+        resize_keyboard=True,
+        one_time_keyboard=True,
+        input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
+    )
+
+# Клавиатуры опроса не зависят от пользователя, поэтому создаем их один раз
+_VASINI_KEYBOARDS = [_build_vasini_keyboard(question) for question in _VASINI_QUESTIONS]
+
+_DEMO_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[[KeyboardButton(text="❌ Отменить опрос")]],
+    resize_keyboard=True,
+    one_time_keyboard=False,
+    input_field_placeholder="Введите ваш ответ..."
+)
+
+_VASINI_CONFIRM_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="✅ Да, готов(а)")],
+        [KeyboardButton(text="❌ Отменить опрос")]
+    ],
+    resize_keyboard=True,
+    one_time_keyboard=True
+)
+
+# Шаблоны для распознавания варианта ответа на вопрос Vasini
+_OPTION_LETTERS = frozenset({"A", "B", "C", "D"})
+# Формат "A: текст" или "A текст"
+_OPT_RE = re.compile(r'^\s*([ABCD])(?:[:\s]|$)', re.IGNORECASE)
+# Буква варианта в любом месте текста (менее строгая проверка)
+_OPT_ANYWHERE_RE = re.compile(r'(?:^|\s)([ABCD])(?=\s|$)', re.IGNORECASE)
+
+# Inline-клавиатуры с постоянным содержимым
+_SURVEY_RESTART_CONFIRM_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="✅ Да, начать заново", callback_data="confirm_survey")
+    .button(text="❌ Нет, отмена", callback_data="cancel_survey")
+    .adjust(2)  # Размещаем обе кнопки в одном ряду
+    .as_markup()
+)
+
+_ADVICE_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="💡 Получить совет", callback_data="get_advice")
+    .adjust(1)
+    .as_markup()
+)
+
+_DETAILS_NAV_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="💡 Получить совет", callback_data="get_advice")
+    .button(text="🔙 Назад", callback_data="view_profile")
+    .adjust(1)
+    .as_markup()
+)
+
+_PROFILE_RESET_CONFIRM_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="✅ Да, сбросить профиль", callback_data="confirm_profile_reset")
+    .button(text="❌ Нет, отмена", callback_data="cancel_profile_reset")
+    .adjust(1)
+    .as_markup()
+)
+
+# Действия под профилем, открытым через callback "view_profile"
+_VIEW_PROFILE_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="💡 Получить совет", callback_data="get_advice")
+    .button(text="🔄 Пройти опрос заново", callback_data="restart_survey")
+    .button(text="🔙 Главное меню", callback_data="main_menu")
+    .adjust(1)
+    .as_markup()
+)
+
+# Действия под профилем, открытым командой /profile
+_COMMAND_PROFILE_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="🔄 Пройти опрос заново", callback_data="restart_survey")
+    .button(text="💡 Получить совет", callback_data="get_advice")
+    .button(text="◀️ Вернуться в меню", callback_data="main_menu")
+    .adjust(1)
+    .as_markup()
+)
+
+# Действия после выдачи совета
+_ADVICE_FOLLOWUP_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="🔄 Получить другой совет", callback_data="get_advice")
+    .button(text="👤 Посмотреть профиль", callback_data="view_profile")
+    .button(text="◀️ Главное меню", callback_data="main_menu")
+    .adjust(1)
+    .as_markup()
+)
+
+# Предложение пройти опрос, если профиль не найден (кнопка "Мой профиль")
+_PROFILE_NOT_FOUND_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="📝 Пройти опрос", callback_data="start_survey")
+    .button(text="🔙 Главное меню", callback_data="main_menu")
+    .adjust(1)
+    .as_markup()
+)
+
+# Предложение пройти опрос для команд /profile и /advice без профиля
+_START_SURVEY_MARKUP = (
+    InlineKeyboardBuilder()
+    .button(text="✅ Начать опрос", callback_data="start_survey")
+    .as_markup()
+)
+
+# Основная клавиатура приложения
+_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="👤 Профиль"), KeyboardButton(text="📝 Опрос")],
+        [KeyboardButton(text="🧘 Медитации"), KeyboardButton(text="⏰ Напоминания")],
+        [KeyboardButton(text="💡 Советы"), KeyboardButton(text="💬 Помощь")],
+        [KeyboardButton(text="🔄 Рестарт")]
+    ],
+    resize_keyboard=True
+)
+
 # Функция для получения основной клавиатуры
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """
     Возвращает основную клавиатуру приложения.
     
+    Клавиатура создается один раз при импорте модуля и переиспользуется.
+    
     Returns:
         ReplyKeyboardMarkup: Клавиатура с основными функциями
     """
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="👤 Профиль"), KeyboardButton(text="📝 Опрос")],
-            [KeyboardButton(text="🧘 Медитации"), KeyboardButton(text="⏰ Напоминания")],
-            [KeyboardButton(text="💡 Советы"), KeyboardButton(text="💬 Помощь")],
-            [KeyboardButton(text="🔄 Рестарт")]
-        ],
-        resize_keyboard=True
+    return _MAIN_KEYBOARD
+
+# HTML-теги Telegram (<b>, <i>, <a href="...">, ...) для переноса незакрытых тегов между частями
+_HTML_TAG_RE = re.compile(r'<(/?)([a-zA-Z][\w-]*)[^>]*>')
+
+# Запас длины части под закрывающие теги, добавляемые в ее конец
+_TAG_RESERVE = 100
+
+def _find_cut(text: str, start: int, end: int) -> int:
+    """
+    Выбирает позицию разреза текста в диапазоне (start, end].
+    
+    Сначала ищется граница абзаца во второй половине диапазона, затем
+    перенос строки, затем пробел; если их нет, текст режется по end.
+    Разрез никогда не попадает внутрь HTML-тега или HTML-сущности.
+    
+    Args:
+        text: Исходный текст
+        start: Начало текущей части
+        end: Максимально допустимый конец текущей части
+        
+    Returns:
+        int: Позиция, с которой начинается следующая часть
+    """
+    # Теги в самом начале части целиком остаются в ней: разрез ищется после них
+    low = start
+    while text.startswith('<', low):
+        gt = text.find('>', low, end)
+        if gt == -1:
+            break
+        low = gt + 1
+    
+    cut = end
+    for sep, min_pos in (("\n\n", max(low, start + (end - start) // 2)), ("\n", low), (" ", low)):
+        j = text.rfind(sep, low, end)
+        if j >= min_pos:
+            cut = j + len(sep)
+            break
+    else:
+        # Не разрезаем сущность вида "&amp;"
+        amp = text.rfind('&', max(start, cut - 10), cut)
+        if amp > start and text.find(';', amp, cut) == -1:
+            cut = amp
+    
+    # Не разрезаем тег "<...>" (в том числе по пробелу внутри <a href="...">)
+    lt = text.rfind('<', start, cut)
+    if lt > start and text.find('>', lt, cut) == -1:
+        cut = lt
+    return cut
+
+def _chunk_html(text: str, limit: int = 4000) -> List[str]:
+    """
+    Разбивает длинный HTML-текст на части не длиннее limit символов.
+    
+    Текст режется по границам абзацев, затем строк, затем слов. Если на
+    границе части остаются незакрытые теги, они закрываются в конце части
+    и открываются заново в начале следующей, чтобы каждая часть была
+    корректным HTML для Telegram.
+    
+    Args:
+        text: Исходный текст
+        limit: Максимальная длина одной части
+        
+    Returns:
+        List[str]: Список частей текста
+    """
+    if len(text) <= limit:
+        return [text] if text else []
+    
+    parts = []
+    # Незакрытые теги с начала текста до текущей позиции: (имя, открывающий тег)
+    open_tags: List[Tuple[str, str]] = []
+    i = 0
+    length = len(text)
+    while i < length:
+        prefix = ''.join(tag for _, tag in open_tags)
+        budget = max(limit - len(prefix) - _TAG_RESERVE, 1)
+        if length - i <= limit - len(prefix):
+            parts.append(prefix + text[i:])
+            break
+        
+        cut = _find_cut(text, i, i + budget)
+        segment = text[i:cut]
+        for match in _HTML_TAG_RE.finditer(segment):
+            name = match.group(2).lower()
+            if not match.group(1):
+                open_tags.append((name, match.group(0)))
+            else:
+                # Закрываем последний открытый тег с тем же именем
+                for k in range(len(open_tags) - 1, -1, -1):
+                    if open_tags[k][0] == name:
+                        del open_tags[k]
+                        break
+        
+        suffix = ''.join(f"</{name}>" for name, _ in reversed(open_tags))
+        parts.append(prefix + segment + suffix)
+        i = cut
+    return parts
+
+async def _send_long_html(target: Message, text: str, final_markup=None, limit: int = 4000):
+    """
+    Отправляет длинный HTML-текст частями с клавиатурой под последней частью.
+    
+    Части отправляются последовательно: Telegram не гарантирует порядок
+    сообщений, отправленных параллельно. Если Telegram ограничивает частоту
+    отправки в чат, часть отправляется повторно после паузы retry_after,
+    а не теряется вместе с остатком профиля.
+    
+    Args:
+        target: Сообщение, в ответ на которое отправляется текст
+        text: Исходный текст
+        final_markup: Клавиатура для последней части
+        limit: Максимальная длина одной части
+    """
+    parts = _chunk_html(text, limit)
+    last_index = len(parts) - 1
+    for i, part in enumerate(parts):
+        markup = final_markup if i == last_index else None
+        try:
+            await target.answer(part, parse_mode="HTML", reply_markup=markup)
+        except TelegramRetryAfter as e:
+            logger.warning("Превышен лимит отправки в чат, повтор через %s с", e.retry_after)
+            await asyncio.sleep(e.retry_after)
+            await target.answer(part, parse_mode="HTML", reply_markup=markup)
+
+# Ссылки на фоновые задачи удаления, чтобы их не собрал сборщик мусора до завершения
+_background_tasks = set()
+
+def _log_delete_error(task: asyncio.Task):
+    """
+    Логирует ошибку фонового удаления сообщения, если она произошла.
+    
+    Args:
+        task: Завершившаяся задача удаления
+    """
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Не удалось удалить сообщение: %s", task.exception())
+
+def _delete_in_background(message: Message):
+    """
+    Удаляет сообщение, не дожидаясь ответа Telegram.
+    
+    Удаление не влияет на следующее сообщение пользователю, поэтому
+    выполняется параллельно с отправкой ответа.
+    
+    Args:
+        message: Сообщение для удаления
+    """
+    task = asyncio.create_task(message.delete())
+    _background_tasks.add(task)
+    task.add_done_callback(_log_delete_error)
+
+def _start_typing(target: Message) -> asyncio.Task:
+    """
+    Запускает отправку индикатора "печатает..." в фоне.
+    
+    Args:
+        target: Сообщение, в чат которого отправляется индикатор
+    
+    Returns:
+        asyncio.Task: Задача отправки; ее нужно дождаться через _finish_typing
+    """
+    return asyncio.create_task(
+        target.bot.send_chat_action(chat_id=target.chat.id, action="typing")
+    )
+
+async def _finish_typing(task: asyncio.Task):
+    """
+    Дожидается отправки индикатора "печатает...", не прерывая обработчик.
+    
+    Индикатор носит только информационный характер, поэтому ошибка
+    Telegram при его отправке логируется и не мешает ответу пользователю.
+    
+    Args:
+        task: Задача, созданная _start_typing
+    """
+    try:
+        await task
+    except TelegramAPIError as e:
+        logger.warning("Не удалось отправить индикатор набора текста: %s", e)
+
+def _profile_text(user_data: Dict[str, Any]) -> str:
+    """
+    Возвращает текст профиля пользователя из данных FSM.
+    
+    Профиль хранится один раз, в profile_text; у профилей, сохраненных
+    раньше, он мог остаться только в profile_details.
+    
+    Args:
+        user_data: Данные пользователя из состояния FSM
+    
+    Returns:
+        str: Текст профиля или пустая строка
+    """
+    return user_data.get("profile_text") or user_data.get("profile_details", "")
+
+# Тексты кнопок, которые обрабатываются отдельно от ответов на вопросы
+_CANCEL_TEXTS = frozenset({"❌ Отменить опрос"})
+_CONFIRM_READY = frozenset({"✅ Да, готов(а)"})
+
+# Префикс сообщения при повторном показе вопроса после нераспознанного ответа
+_RETRY_PREFIX = "Пожалуйста, выберите один из предложенных вариантов ответа (A, B, C или D).\n\n"
+
+async def _resend_vasini_question(message: Message, idx: int, prefix: str = ""):
+    """
+    Отправляет вопрос Vasini с готовой клавиатурой вариантов ответа.
+    
+    Args:
+        message: Сообщение от пользователя
+        idx: Индекс вопроса Vasini
+        prefix: Текст перед вопросом (например, просьба повторить выбор)
+    """
+    question = _VASINI_QUESTIONS[idx]
+    await message.answer(
+        f"{prefix}Вопрос {idx + 1}/34: {question.text}",
+        reply_markup=_VASINI_KEYBOARDS[idx]
     )
 
 async def start_survey(message: Message, state: FSMContext):
@@ -66,29 +448,31 @@ async def start_survey(message: Message, state: FSMContext):
     
     if has_profile:
         # Если у пользователя уже есть профиль, спрашиваем подтверждение на перезапись
-        builder = InlineKeyboardBuilder()
-        builder.button(text="✅ Да, начать заново", callback_data="confirm_survey")
-        builder.button(text="❌ Нет, отмена", callback_data="cancel_survey")
-        builder.adjust(2)  # Размещаем обе кнопки в одном ряду
-        
         await message.answer(
             "⚠️ <b>Внимание:</b>\n\n"
             "У вас уже есть заполненный профиль. Если вы пройдете опрос заново, "
             "ваши текущие данные будут перезаписаны.\n\n"
             "Вы уверены, что хотите начать опрос заново?",
-            reply_markup=builder.as_markup(),
+            reply_markup=_SURVEY_RESTART_CONFIRM_MARKUP,
             parse_mode="HTML"
         )
         return
     
     # Если профиля нет, начинаем опрос сразу
-    # Импортируем функцию для получения демо-вопросов
-    from questions import get_demo_questions
+    await _begin_demo_survey(message, state)
+
+async def _begin_demo_survey(message: Message, state: FSMContext):
+    """
+    Начинает опрос с демо-вопросов без проверки существующего профиля.
     
-    # Получаем список демо-вопросов
-    demo_questions = get_demo_questions()
+    Используется в start_survey, а также в обработчиках подтверждения
+    перезапуска, где профиль уже сброшен.
     
-    # Показываем первый вопрос
+    Args:
+        message: Сообщение от пользователя
+        state: Состояние FSM
+    """
+    # Показываем приветствие опроса
     await message.answer(
         "📋 <b>Начинаем опрос!</b>\n\n"
         "Я задам несколько вопросов, чтобы лучше узнать тебя. "
@@ -99,13 +483,8 @@ async def start_survey(message: Message, state: FSMContext):
     
     # Показываем первый вопрос
     await message.answer(
-        f"Вопрос 1: {demo_questions[0]['text']}",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="❌ Отменить опрос")]],
-            resize_keyboard=True,
-            one_time_keyboard=False,
-            input_field_placeholder="Введите ваш ответ..."
-        )
+        f"Вопрос 1: {_DEMO_QUESTIONS[0]['text']}",
+        reply_markup=_DEMO_KEYBOARD
     )
     
     # Инициализируем опрос
@@ -117,10 +496,9 @@ async def start_survey(message: Message, state: FSMContext):
         is_demo_questions=True
     )
     
-    logger.info(f"Пользователь {message.from_user.id} начал опрос")
+    logger.info("Пользователь %s начал опрос", message.from_user.id)
 
 # Обработчик для подтверждения перезапуска опроса
-@survey_router.callback_query(F.data == "confirm_survey")
 async def confirm_restart_survey(callback: CallbackQuery, state: FSMContext):
     """
     Подтверждает перезапуск опроса.
@@ -130,7 +508,7 @@ async def confirm_restart_survey(callback: CallbackQuery, state: FSMContext):
         state: Состояние FSM
     """
     # Удаляем сообщение с кнопками
-    await callback.message.delete()
+    _delete_in_background(callback.message)
     
     # Очищаем текущие данные профиля
     await state.update_data(
@@ -141,22 +519,22 @@ async def confirm_restart_survey(callback: CallbackQuery, state: FSMContext):
     )
     
     # Начинаем опрос заново
-    await start_survey(callback.message, state)
+    await _begin_demo_survey(callback.message, state)
     
     # Отвечаем на callback
     await callback.answer("Начинаем опрос заново")
 
 # Обработчик для отмены перезапуска опроса
-@survey_router.callback_query(F.data == "cancel_survey")
-async def cancel_restart_survey(callback: CallbackQuery):
+async def cancel_restart_survey(callback: CallbackQuery, state: FSMContext):
     """
     Отменяет перезапуск опроса.
     
     Args:
         callback: Callback query
+        state: Состояние FSM
     """
     # Удаляем сообщение с кнопками
-    await callback.message.delete()
+    _delete_in_background(callback.message)
     
     # Отправляем сообщение об отмене
     await callback.message.answer(
@@ -177,8 +555,11 @@ async def process_survey_answer(message: Message, state: FSMContext):
         message: Сообщение от пользователя
         state: Состояние FSM
     """
-    # Если пользователь хочет отменить опрос
-    if message.text == "❌ Отменить опрос":
+    # Текст сообщения читаем один раз и дальше используем локальную переменную
+    text = message.text or ""
+    
+    # Если пользователь хочет отменить опрос (проверяется один раз для всех веток)
+    if text in _CANCEL_TEXTS:
         await state.clear()
         await message.answer(
             "❌ Опрос отменен. Вы можете начать его заново в любое время.",
@@ -189,35 +570,31 @@ async def process_survey_answer(message: Message, state: FSMContext):
     # Получаем текущее состояние опроса
     data = await state.get_data()
     question_index = data.get("question_index", 0)
-    answers = data.get("answers", {})
+    # Ответы хранятся в компактном виде: словарь демо-ответов и байт на каждый вопрос Vasini
+    demo_answers, vasini_answers = unpack_answers(data.get("answers"))
     is_demo_questions = data.get("is_demo_questions", True)
     
-    # Импортируем функции для получения вопросов
-    from questions import get_demo_questions, get_all_vasini_questions
-    
-    # Получаем списки вопросов
-    demo_questions = get_demo_questions()
-    # Используем функцию get_all_vasini_questions вместо прямого объединения
-    try:
-        vasini_questions = get_all_vasini_questions()
-        logger.info(f"Загружено {len(vasini_questions)} вопросов Vasini")
-    except Exception as e:
-        logger.error(f"Ошибка при загрузке вопросов Vasini: {e}")
-        # Создаем пустой список в случае ошибки
-        vasini_questions = []
-        railway_print("ОШИБКА: Не удалось загрузить вопросы Vasini, опрос будет недоступен", "ERROR")
+    # Проверяем, что индекс вопроса не выходит за пределы списка вопросов
+    if not 0 <= question_index < (_DEMO_LEN if is_demo_questions else _VASINI_LEN):
+        logger.error("Некорректный индекс вопроса %s у пользователя %s", question_index, message.from_user.id)
+        await state.set_state(None)
+        await message.answer(
+            "⚠️ Не удалось продолжить опрос. Пожалуйста, начните его заново.",
+            reply_markup=get_main_keyboard()
+        )
+        return
     
     # Определяем текущий вопрос
     if is_demo_questions:
-        current_question = demo_questions[question_index]
+        current_question = _DEMO_QUESTIONS[question_index]
         # Сохраняем ответ на демо-вопрос
         question_id = current_question["id"]
-        answers[question_id] = message.text
+        demo_answers[question_id] = text
         # Переходим к следующему вопросу
         question_index += 1
         
         # Если демо-вопросы закончились, переходим к вопросам Vasini
-        if question_index >= len(demo_questions):
+        if question_index >= _DEMO_LEN:
             is_demo_questions = False
             question_index = 0
             
@@ -229,20 +606,13 @@ async def process_survey_answer(message: Message, state: FSMContext):
                 "На каждый вопрос нужно выбрать один из вариантов ответа (A, B, C или D).\n\n"
                 "Готовы начать?",
                 parse_mode="HTML",
-                reply_markup=ReplyKeyboardMarkup(
-                    keyboard=[
-                        [KeyboardButton(text="✅ Да, готов(а)")],
-                        [KeyboardButton(text="❌ Отменить опрос")]
-                    ],
-                    resize_keyboard=True,
-                    one_time_keyboard=True
-                )
+                reply_markup=_VASINI_CONFIRM_KEYBOARD
             )
             
-            # Обновляем состояние
+            # Обновляем только изменившиеся поля состояния
             await state.update_data(
                 question_index=question_index,
-                answers=answers,
+                answers=pack_answers(demo_answers, vasini_answers),
                 is_demo_questions=is_demo_questions,
                 waiting_for_vasini_confirmation=True
             )
@@ -250,208 +620,106 @@ async def process_survey_answer(message: Message, state: FSMContext):
     else:
         # Проверяем, ожидаем ли мы подтверждения для начала теста Vasini
         if data.get("waiting_for_vasini_confirmation", False):
-            if message.text == "✅ Да, готов(а)":
+            if text in _CONFIRM_READY:
                 # Начинаем тест Vasini
-                current_question = vasini_questions[question_index]
-                
-                # Создаем клавиатуру с вариантами ответов
-                options = current_question["options"]
-                keyboard = []
-                for option, text in options.items():
-                    # Формируем текст кнопки с более выраженной буквой варианта
-                    button_text = f"{option}: {text}"
-                    keyboard.append([KeyboardButton(text=button_text)])
-                keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-                
                 # Логируем какие варианты ответов мы показываем
-                logger.info(f"Показываем вопрос 1 с вариантами ответов: {', '.join(options.keys())}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Показываем вопрос 1 с вариантами ответов: %s", ", ".join(_VASINI_QUESTIONS[question_index].options))
                 
-                await message.answer(
-                    f"Вопрос {question_index + 1}/34: {current_question['text']}",
-                    reply_markup=ReplyKeyboardMarkup(
-                        keyboard=keyboard,
-                        resize_keyboard=True,
-                        one_time_keyboard=True,
-                        input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-                    )
-                )
+                await _resend_vasini_question(message, question_index)
                 
-                # Обновляем состояние
-                await state.update_data(
-                    waiting_for_vasini_confirmation=False
-                )
-                return
-            elif message.text == "❌ Отменить опрос":
-                await state.clear()
-                await message.answer(
-                    "❌ Опрос отменен. Вы можете начать его заново в любое время.",
-                    reply_markup=get_main_keyboard()
-                )
+                # Обновляем только изменившиеся поля состояния
+                await state.update_data(waiting_for_vasini_confirmation=False)
                 return
             else:
                 # Если ответ не соответствует формату, просим повторить
-                options = current_question["options"]
-                keyboard = []
-                for opt, text in options.items():
-                    # Формируем текст кнопки с более выраженной буквой варианта
-                    button_text = f"{opt}: {text}"
-                    keyboard.append([KeyboardButton(text=button_text)])
-                keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-                
-                # Логируем, что пользователь должен повторить выбор
-                logger.info(f"Пользователь должен повторить выбор для вопроса {question_index + 1}")
-                
-                await message.answer(
-                    f"Пожалуйста, выберите один из предложенных вариантов ответа (A, B, C или D).\n\n"
-                    f"Вопрос {question_index + 1}/34: {current_question['text']}",
-                    reply_markup=ReplyKeyboardMarkup(
-                        keyboard=keyboard,
-                        resize_keyboard=True,
-                        one_time_keyboard=True,
-                        input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-                    )
-                )
+                logger.info("Пользователь должен повторить выбор для вопроса %d", question_index + 1)
+                await _resend_vasini_question(message, question_index, _RETRY_PREFIX)
                 return
         
         # Обрабатываем ответ на вопрос Vasini
-        current_question = vasini_questions[question_index]
+        current_question = _VASINI_QUESTIONS[question_index]
         
         # Логируем полученный текст сообщения для отладки
-        logger.info(f"Получен ответ на вопрос {question_index + 1}: '{message.text}'")
+        logger.info("Получен ответ на вопрос %d: '%s'", question_index + 1, text)
         
         # Проверяем, что ответ содержит букву варианта (A, B, C или D)
-        option = None
-        # Проверяем различные форматы ответов
-        for opt in ["A", "B", "C", "D"]:
-            # Проверка на формат "A: текст"
-            if message.text.startswith(f"{opt}:"):
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' по шаблону '{opt}:'")
-                break
-            # Проверка на формат "A текст" без двоеточия
-            elif message.text.startswith(f"{opt} "):
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' по шаблону '{opt} '")
-                break
-            # Проверка если пользователь ввел только букву "A", "B", "C" или "D"
-            elif message.text.upper() == opt:
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' (пользователь ввел только букву)")
-                break
-            # Проверка если текст содержит букву в любом месте (менее строгая проверка)
-            elif f" {opt} " in f" {message.text.upper()} ":
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' в тексте '{message.text}'")
-                break
+        option = text.strip().upper()
+        if option in _OPTION_LETTERS:
+            # Пользователь ввел только букву "A", "B", "C" или "D"
+            logger.debug("Распознан ответ '%s' (пользователь ввел только букву)", option)
+        else:
+            # Проверяем форматы "A: текст", "A текст" и букву в любом месте текста
+            match = _OPT_RE.match(text) or _OPT_ANYWHERE_RE.search(text)
+            option = match.group(1).upper() if match else None
+            if option:
+                logger.debug("Распознан ответ '%s' в тексте '%s'", option, text)
         
         if not option:
             # Если ответ не распознан, логируем это
-            logger.warning(f"Не удалось распознать вариант ответа в тексте: '{message.text}'")
+            logger.warning("Не удалось распознать вариант ответа в тексте: '%s'", text)
             
             # Если ответ не соответствует формату, просим повторить
-            options = current_question["options"]
-            keyboard = []
-            for opt, text in options.items():
-                # Формируем текст кнопки с более выраженной буквой варианта
-                button_text = f"{opt}: {text}"
-                keyboard.append([KeyboardButton(text=button_text)])
-            keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-            
-            # Логируем, что пользователь должен повторить выбор
-            logger.info(f"Пользователь должен повторить выбор для вопроса {question_index + 1}")
-            
-            await message.answer(
-                f"Пожалуйста, выберите один из предложенных вариантов ответа (A, B, C или D).\n\n"
-                f"Вопрос {question_index + 1}/34: {current_question['text']}",
-                reply_markup=ReplyKeyboardMarkup(
-                    keyboard=keyboard,
-                    resize_keyboard=True,
-                    one_time_keyboard=True,
-                    input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-                )
-            )
+            await _resend_vasini_question(message, question_index, _RETRY_PREFIX)
             return
         
         # Сохраняем ответ на вопрос Vasini
-        question_id = current_question["id"]
-        answers[question_id] = option
+        question_id = current_question.id
+        vasini_answers[question_index] = VASINI_OPTION_CODES[option]
         
         # Отправляем интерпретацию ответа пользователю
         try:
-            interpretation = current_question["interpretations"][option]
+            interpretation_msg = _INTERPRETATION_MSGS.get((question_id, option))
+            if interpretation_msg is None:
+                raise KeyError(f"нет интерпретации для варианта {option} вопроса {question_id}")
             await message.answer(
-                f"💡 <b>Интерпретация:</b>\n\n{interpretation}",
+                interpretation_msg,
                 parse_mode="HTML"
             )
-            # Добавляем небольшую задержку для удобства чтения
-            await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
         except Exception as e:
-            logger.error(f"Ошибка при отправке интерпретации: {e}")
+            logger.error("Ошибка при отправке интерпретации: %s", e)
         
         # Переходим к следующему вопросу
         question_index += 1
         
         # Если все вопросы Vasini заданы, завершаем опрос
-        if question_index >= len(vasini_questions):
-            await complete_survey(message, state, answers)
+        if question_index >= _VASINI_LEN:
+            await complete_survey(message, state, pack_answers(demo_answers, vasini_answers))
             return
     
     # Показываем следующий вопрос
     if is_demo_questions:
-        next_question = demo_questions[question_index]
+        next_question = _DEMO_QUESTIONS[question_index]
         await message.answer(
-            f"Вопрос {question_index + 1}/{len(demo_questions)}: {next_question['text']}",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=[[KeyboardButton(text="❌ Отменить опрос")]],
-                resize_keyboard=True,
-                one_time_keyboard=False,
-                input_field_placeholder="Введите ваш ответ..."
-            )
+            f"Вопрос {question_index + 1}/{_DEMO_LEN}: {next_question['text']}",
+            reply_markup=_DEMO_KEYBOARD
         )
     else:
-        next_question = vasini_questions[question_index]
-        
-        # Создаем клавиатуру с вариантами ответов
-        options = next_question["options"]
-        keyboard = []
-        for option, text in options.items():
-            # Формируем текст кнопки, делая букву варианта более выраженной
-            button_text = f"{option}: {text}"
-            keyboard.append([KeyboardButton(text=button_text)])
-        keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
+        next_question = _VASINI_QUESTIONS[question_index]
         
         # Логируем какие варианты ответов мы показываем
-        logger.info(f"Показываем вопрос {question_index + 1} с вариантами ответов: {', '.join(options.keys())}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Показываем вопрос %d с вариантами ответов: %s", question_index + 1, ", ".join(next_question.options))
         
-        await message.answer(
-            f"Вопрос {question_index + 1}/34: {next_question['text']}",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=keyboard,
-                resize_keyboard=True,
-                one_time_keyboard=True,
-                input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-            )
-        )
+        await _resend_vasini_question(message, question_index)
     
-    # Обновляем состояние
+    # Обновляем только изменившиеся поля состояния: снимок data прочитан до
+    # отправки сообщений, и запись всего словаря затерла бы параллельные изменения
     await state.update_data(
         question_index=question_index,
-        answers=answers,
+        answers=pack_answers(demo_answers, vasini_answers),
         is_demo_questions=is_demo_questions
     )
 
-async def complete_survey(message: Message, state: FSMContext, answers: Dict[str, str]):
+async def complete_survey(message: Message, state: FSMContext, answers: Dict[str, Any]):
     """
     Завершает опрос и генерирует психологический профиль пользователя.
     
     Args:
         message: Сообщение от пользователя
         state: Состояние FSM
-        answers: Словарь с ответами пользователя
+        answers: Ответы пользователя (в словарном или компактном формате)
     """
-    # Показываем индикатор "печатает..."
-    await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
-    
     # Отправляем сообщение о том, что опрос завершен и идет генерация профиля
     processing_message = await message.answer(
         "✅ <b>Опрос завершен!</b>\n\n"
@@ -460,87 +728,52 @@ async def complete_survey(message: Message, state: FSMContext, answers: Dict[str
         parse_mode="HTML"
     )
     
-    # Импортируем функцию для определения типа личности
-    from questions import get_personality_type_from_answers
-    
-    # Определяем тип личности
+    # Определяем тип личности (подсчет идет прямо по компактному буферу ответов)
     type_counts, primary_type, secondary_type = get_personality_type_from_answers(answers)
     
+    # Для генерации и сохранения профиля используем словарь {question_id: ответ}
+    answers = answers_to_dict(answers)
+    
     try:
-        # Генерируем профиль
-        profile_data = await generate_profile(answers)
+        # Генерируем профиль, не блокируя цикл событий: generate_profile
+        # ожидает ответа OpenAI асинхронно, а индикатор "печатает..."
+        # обновляется в фоне каждые 5 секунд, пока идет генерация
+        async with ChatActionSender.typing(bot=message.bot, chat_id=message.chat.id):
+            profile_data = await generate_profile(answers)
         
         # Получаем подробный профиль, игнорируем краткую версию
         detailed_profile = profile_data.get("details", "")
         
         # Логируем информацию о полученных профилях для отладки
-        logger.info(f"Получен детальный профиль длиной {len(detailed_profile)} символов")
+        logger.info("Получен детальный профиль длиной %d символов", len(detailed_profile))
         
         # Сбрасываем состояние опроса
         await state.set_state(None)
         
-        # Сохраняем результаты в состоянии пользователя
-        await state.update_data(
+        # Сохраняем результаты в состоянии пользователя; профиль хранится один раз
+        # в profile_text, а старая копия в profile_details очищается
+        saved_data = await state.update_data(
             answers=answers,
             profile_completed=True,
-            profile_details=detailed_profile,
+            profile_details="",
             profile_text=detailed_profile,
             personality_type=primary_type,
             secondary_type=secondary_type,
             type_counts=type_counts
         )
         
-        # Проверяем, что профили действительно сохранились
-        verification_data = await state.get_data()
-        saved_details = verification_data.get("profile_details", "")
-        saved_text = verification_data.get("profile_text", "")
-        logger.info(f"Проверка сохранения детального профиля: сохранено {len(saved_details)} символов в profile_details, {len(saved_text)} символов в profile_text")
+        # Проверяем, что профиль действительно сохранился
+        # (update_data возвращает записанные данные, повторное чтение не требуется)
+        logger.info("Проверка сохранения детального профиля: сохранено %d символов в profile_text",
+                    len(saved_data.get("profile_text", "")))
         
-        # Удаляем сообщение о генерации профиля
-        await processing_message.delete()
-        
-        # Создаем клавиатуру с кнопками
-        builder = InlineKeyboardBuilder()
-        builder.button(text="💡 Получить совет", callback_data="get_advice")
-        builder.adjust(1)  # Располагаем кнопки в столбик
-        
-        # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-        max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-        
-        if len(detailed_profile) > max_message_length:
-            # Разбиваем детальный профиль на части
-            parts = []
-            current_part = ""
-            for line in detailed_profile.split('\n'):
-                if len(current_part) + len(line) + 1 <= max_message_length:
-                    current_part += line + '\n'
-                else:
-                    parts.append(current_part)
-                    current_part = line + '\n'
-            if current_part:
-                parts.append(current_part)
-            
-            # Отправляем части профиля
-            for i, part in enumerate(parts):
-                # Добавляем кнопки только к последней части
-                if i == len(parts) - 1:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML",
-                        reply_markup=builder.as_markup()
-                    )
-                else:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML"
-                    )
-        else:
-            # Отправляем профиль
-            await message.answer(
-                detailed_profile,
-                parse_mode="HTML",
-                reply_markup=builder.as_markup()
-            )
+        # Удаляем сообщение о генерации профиля одновременно с отправкой профиля;
+        # Telegram ограничивает сообщения примерно до 4096 символов,
+        # поэтому длинный профиль отправляется частями
+        await asyncio.gather(
+            processing_message.delete(),
+            _send_long_html(message, detailed_profile, _ADVICE_MARKUP)
+        )
         
         # Возвращаем основную клавиатуру
         await message.answer(
@@ -549,11 +782,11 @@ async def complete_survey(message: Message, state: FSMContext, answers: Dict[str
         )
         
         # Логируем завершение опроса
-        logger.info(f"Пользователь {message.from_user.id} завершил опрос, профиль сгенерирован")
+        logger.info("Пользователь %s завершил опрос, профиль сгенерирован", message.from_user.id)
         
     except Exception as e:
         # В случае ошибки отправляем сообщение
-        logger.error(f"Ошибка при генерации профиля: {e}")
+        logger.error("Ошибка при генерации профиля: %s", e)
         await processing_message.edit_text(
             "❌ <b>Произошла ошибка при генерации профиля.</b>\n\n"
             "Пожалуйста, попробуйте пройти опрос еще раз.",
@@ -571,7 +804,6 @@ async def complete_survey(message: Message, state: FSMContext, answers: Dict[str
         return
 
 # Обработчик для перезапуска опроса
-@survey_router.callback_query(F.data == "restart_survey")
 async def restart_survey(callback: CallbackQuery, state: FSMContext):
     """
     Перезапускает опрос, удаляя предыдущий профиль пользователя.
@@ -581,24 +813,18 @@ async def restart_survey(callback: CallbackQuery, state: FSMContext):
         state: Состояние FSM
     """
     # Спрашиваем подтверждение перед сбросом данных
-    builder = InlineKeyboardBuilder()
-    builder.button(text="✅ Да, сбросить профиль", callback_data="confirm_profile_reset")
-    builder.button(text="❌ Нет, отмена", callback_data="cancel_profile_reset")
-    builder.adjust(1)
-    
     await callback.message.answer(
         "⚠️ <b>Внимание!</b>\n\n"
         "Вы собираетесь сбросить ваш текущий профиль и пройти опрос заново. "
         "Все ваши предыдущие ответы будут удалены.\n\n"
         "Вы уверены, что хотите продолжить?",
-        reply_markup=builder.as_markup(),
+        reply_markup=_PROFILE_RESET_CONFIRM_MARKUP,
         parse_mode="HTML"
     )
     
     # Отвечаем на callback
     await callback.answer("Подтвердите сброс профиля")
 
-@survey_router.callback_query(F.data == "confirm_profile_reset")
 async def confirm_profile_reset(callback: CallbackQuery, state: FSMContext):
     """
     Подтверждает сброс профиля и перезапускает опрос.
@@ -620,7 +846,7 @@ async def confirm_profile_reset(callback: CallbackQuery, state: FSMContext):
     )
     
     # Удаляем сообщение с подтверждением
-    await callback.message.delete()
+    _delete_in_background(callback.message)
     
     # Сообщаем об успешном сбросе
     await callback.message.answer(
@@ -630,26 +856,25 @@ async def confirm_profile_reset(callback: CallbackQuery, state: FSMContext):
     )
     
     # Небольшая задержка перед началом нового опроса
-    import asyncio
     await asyncio.sleep(1)
     
     # Начинаем опрос заново
-    await start_survey(callback.message, state)
+    await _begin_demo_survey(callback.message, state)
     
     # Отвечаем на callback
     await callback.answer("Профиль сброшен, начинаем опрос заново")
-    logger.info(f"Пользователь {callback.from_user.id} сбросил профиль и начал опрос заново")
+    logger.info("Пользователь %s сбросил профиль и начал опрос заново", callback.from_user.id)
 
-@survey_router.callback_query(F.data == "cancel_profile_reset")
-async def cancel_profile_reset(callback: CallbackQuery):
+async def cancel_profile_reset(callback: CallbackQuery, state: FSMContext):
     """
     Отменяет сброс профиля.
     
     Args:
         callback: Callback query
+        state: Состояние FSM
     """
     # Удаляем сообщение с подтверждением
-    await callback.message.delete()
+    _delete_in_background(callback.message)
     
     # Сообщаем об отмене
     await callback.message.answer(
@@ -659,10 +884,9 @@ async def cancel_profile_reset(callback: CallbackQuery):
     
     # Отвечаем на callback
     await callback.answer("Отмена сброса профиля")
-    logger.info(f"Пользователь {callback.from_user.id} отменил сброс профиля")
+    logger.info("Пользователь %s отменил сброс профиля", callback.from_user.id)
 
 # Добавляем новый обработчик для отображения детального профиля
-@survey_router.callback_query(F.data == "show_details")
 async def show_profile_details(callback: CallbackQuery, state: FSMContext):
     """
     Отображает детальный психологический профиль.
@@ -671,16 +895,18 @@ async def show_profile_details(callback: CallbackQuery, state: FSMContext):
         callback: Callback query
         state: Состояние FSM
     """
-    # Показываем индикатор "печатает..."
-    await callback.message.bot.send_chat_action(chat_id=callback.message.chat.id, action="typing")
-
-    # Получаем данные пользователя
-    user_data = await state.get_data()
-    details_text = user_data.get("profile_details", "")
+    # Показываем индикатор "печатает..." одновременно с получением данных пользователя
+    typing_task = _start_typing(callback.message)
+    try:
+        user_data = await state.get_data()
+    finally:
+        await _finish_typing(typing_task)
+    details_text = _profile_text(user_data)
     
     # Логируем полученные данные для отладки
-    logger.info(f"Запрошен детальный профиль. Длина текста: {len(details_text) if details_text else 0}")
-    logger.info(f"Доступные ключи в user_data: {', '.join(user_data.keys())}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Запрошен детальный профиль. Длина текста: %d", len(details_text) if details_text else 0)
+        logger.info("Доступные ключи в user_data: %s", ", ".join(user_data.keys()))
     
     if not details_text or len(details_text) < 20:
         await callback.message.answer(
@@ -690,172 +916,85 @@ async def show_profile_details(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Детальный профиль не найден")
         return
     
-    # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-    max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-    
-    if len(details_text) > max_message_length:
-        # Разбиваем детальный профиль на части
-        parts = []
-        current_part = ""
-        for line in details_text.split('\n'):
-            if len(current_part) + len(line) + 1 <= max_message_length:
-                current_part += line + '\n'
-            else:
-                parts.append(current_part)
-                current_part = line + '\n'
-        if current_part:
-            parts.append(current_part)
-        
-        # Отправляем части профиля
-        for i, part in enumerate(parts):
-            # Добавляем кнопки только к последней части
-            if i == len(parts) - 1:
-                # Добавляем кнопки для навигации
-                builder = InlineKeyboardBuilder()
-                builder.button(text="💡 Получить совет", callback_data="get_advice")
-                builder.button(text="🔙 Назад", callback_data="view_profile")
-                builder.adjust(1)
-                
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-            else:
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML"
-                )
-    else:
-        # Добавляем кнопки для навигации
-        builder = InlineKeyboardBuilder()
-        builder.button(text="💡 Получить совет", callback_data="get_advice")
-        builder.button(text="🔙 Назад", callback_data="view_profile")
-        builder.adjust(1)
-        
-        # Отправляем детальный профиль
-        await callback.message.answer(
-            details_text,
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
-        )
-    
-    # Возвращаем основную клавиатуру после вывода деталей
-    await callback.message.answer(
-        "⬅️ Вернуться в главное меню",
-        reply_markup=get_main_keyboard()
-    )
+    # Отправляем детальный профиль (по частям, если он длиннее лимита Telegram)
+    # с кнопками для навигации под последней частью
+    await _send_long_html(callback.message, details_text, _DETAILS_NAV_MARKUP)
     
     # Отвечаем на callback
     await callback.answer("Детальный психологический профиль")
 
-@survey_router.callback_query(F.data == "view_profile")
-async def view_profile_callback(callback: CallbackQuery, state: FSMContext):
+async def _render_profile(target: Message, state: FSMContext, *, from_callback: bool) -> str:
     """
-    Отображает профиль пользователя.
+    Отправляет профиль пользователя для команды /profile и кнопки "Мой профиль".
     
     Args:
-        callback: Callback query
+        target: Сообщение, в чат которого отправляется профиль
         state: Состояние FSM
+        from_callback: True, если профиль запрошен кнопкой, а не командой
     
-    Примечание: Функция изменена для показа полного профиля вместо краткой версии.
-    Кнопки "Статистика" и "Детальный анализ" удалены согласно требованиям.
+    Returns:
+        str: Короткий статус для ответа на callback
     """
-    # Показываем индикатор "печатает..."
-    await callback.message.bot.send_chat_action(chat_id=callback.message.chat.id, action="typing")
-    
-    # Получаем данные пользователя
-    user_data = await state.get_data()
+    # Показываем индикатор "печатает..." в фоне, пока читаем данные пользователя;
+    # индикатор должен быть отправлен до ответа, даже если чтение завершилось ошибкой
+    typing_task = _start_typing(target)
+    try:
+        user_data = await state.get_data()
+    finally:
+        await _finish_typing(typing_task)
     profile_completed = user_data.get("profile_completed", False)
     
     if not profile_completed:
         # Профиль не найден, предлагаем пройти опрос
-        builder = InlineKeyboardBuilder()
-        builder.button(text="📝 Пройти опрос", callback_data="start_survey")
-        builder.button(text="🔙 Главное меню", callback_data="main_menu")
-        builder.adjust(1)
-        
-        await callback.message.answer(
-            "❌ <b>Профиль не найден</b>\n\n"
-            "Для создания психологического профиля необходимо пройти опрос. "
-            "Это займет около 5-10 минут и поможет мне лучше понять ваш стиль мышления и особенности.",
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
-        )
-        
-        # Возвращаем основную клавиатуру
-        await callback.message.answer(
-            "Вернуться в главное меню",
-            reply_markup=get_main_keyboard()
-        )
-        
-        await callback.answer("Профиль не найден")
-        return
+        if from_callback:
+            await target.answer(
+                "❌ <b>Профиль не найден</b>\n\n"
+                "Для создания психологического профиля необходимо пройти опрос. "
+                "Это займет около 5-10 минут и поможет мне лучше понять ваш стиль мышления и особенности.",
+                parse_mode="HTML",
+                reply_markup=_PROFILE_NOT_FOUND_MARKUP
+            )
+        else:
+            await target.answer(
+                "У вас пока нет психологического профиля. Чтобы создать его, нужно пройти опрос.",
+                reply_markup=_START_SURVEY_MARKUP
+            )
+        return "Профиль не найден"
     
     # Получаем детальный профиль
-    details_text = user_data.get("profile_details", "")
+    details_text = _profile_text(user_data)
     
     if not details_text or len(details_text) < 20:
-        await callback.message.answer(
+        await target.answer(
             "❌ <b>Ошибка:</b> Детальный профиль не найден или пуст. Пожалуйста, пройдите опрос заново.",
             parse_mode="HTML"
         )
-        await callback.answer("Детальный профиль не найден")
-        return
+        return "Детальный профиль не найден"
     
-    # Создаем клавиатуру с кнопками для действий
-    builder = InlineKeyboardBuilder()
-    builder.button(text="💡 Получить совет", callback_data="get_advice")
-    builder.button(text="🔄 Пройти опрос заново", callback_data="restart_survey")
-    builder.button(text="🔙 Главное меню", callback_data="main_menu")
-    builder.adjust(1)
-    
-    # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-    max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-    
-    if len(details_text) > max_message_length:
-        # Разбиваем детальный профиль на части
-        parts = []
-        current_part = ""
-        for line in details_text.split('\n'):
-            if len(current_part) + len(line) + 1 <= max_message_length:
-                current_part += line + '\n'
-            else:
-                parts.append(current_part)
-                current_part = line + '\n'
-        if current_part:
-            parts.append(current_part)
-        
-        # Отправляем части профиля
-        for i, part in enumerate(parts):
-            # Добавляем кнопки только к последней части
-            if i == len(parts) - 1:
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-            else:
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML"
-                )
-    else:
-        # Отправляем профиль
-        await callback.message.answer(
-            details_text,
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
-        )
+    # Отправляем профиль (по частям, если он длиннее лимита Telegram)
+    # с кнопками для действий под последней частью
+    await _send_long_html(target, details_text, _VIEW_PROFILE_MARKUP if from_callback else _COMMAND_PROFILE_MARKUP)
     
-    # Возвращаем основную клавиатуру
-    await callback.message.answer(
-        "⬅️ Вернуться в главное меню",
-        reply_markup=get_main_keyboard()
-    )
+    if not from_callback:
+        # Устанавливаем состояние просмотра профиля
+        await state.set_state(ProfileStates.viewing)
+    return "Профиль загружен"
+
+async def view_profile_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Отображает профиль пользователя.
     
-    await callback.answer("Профиль загружен")
-    logger.info(f"Пользователь {callback.from_user.id} просмотрел свой профиль")
+    Args:
+        callback: Callback query
+        state: Состояние FSM
+    
+    Примечание: Функция изменена для показа полного профиля вместо краткой версии.
+    Кнопки "Статистика" и "Детальный анализ" удалены согласно требованиям.
+    """
+    status = await _render_profile(callback.message, state, from_callback=True)
+    await callback.answer(status)
+    if status == "Профиль загружен":
+        logger.info("Пользователь %s просмотрел свой профиль", callback.from_user.id)
 
 # Регистрация обработчиков команд
 @survey_router.message(Command("survey"))
@@ -884,80 +1023,7 @@ async def command_profile(message: Message, state: FSMContext):
     Примечание: Функция изменена для отображения полного профиля сразу
     вместо краткой версии и промежуточных кнопок.
     """
-    # Получаем данные пользователя
-    user_data = await state.get_data()
-    profile_completed = user_data.get("profile_completed", False)
-    
-    if profile_completed:
-        # Показываем индикатор "печатает..."
-        await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
-        
-        # Получаем детальный профиль
-        details_text = user_data.get("profile_details", "")
-        
-        if not details_text or len(details_text) < 20:
-            await message.answer(
-                "❌ <b>Ошибка:</b> Детальный профиль не найден или пуст. Пожалуйста, пройдите опрос заново.",
-                parse_mode="HTML"
-            )
-            return
-        
-        # Создаем клавиатуру с кнопками для действий
-        builder = InlineKeyboardBuilder()
-        builder.button(text="🔄 Пройти опрос заново", callback_data="restart_survey")
-        builder.button(text="💡 Получить совет", callback_data="get_advice")
-        builder.button(text="◀️ Вернуться в меню", callback_data="main_menu")
-        builder.adjust(1)
-        
-        # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-        max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-        
-        if len(details_text) > max_message_length:
-            # Разбиваем детальный профиль на части
-            parts = []
-            current_part = ""
-            for line in details_text.split('\n'):
-                if len(current_part) + len(line) + 1 <= max_message_length:
-                    current_part += line + '\n'
-                else:
-                    parts.append(current_part)
-                    current_part = line + '\n'
-            if current_part:
-                parts.append(current_part)
-            
-            # Отправляем части профиля
-            for i, part in enumerate(parts):
-                # Добавляем кнопки только к последней части
-                if i == len(parts) - 1:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML",
-                        reply_markup=builder.as_markup()
-                    )
-                else:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML"
-                    )
-        else:
-            # Отправляем профиль
-            await message.answer(
-                details_text,
-                parse_mode="HTML",
-                reply_markup=builder.as_markup()
-            )
-        
-        # Устанавливаем состояние просмотра профиля
-        await state.set_state(ProfileStates.viewing)
-    else:
-        # Предлагаем пройти опрос, если профиля нет
-        builder = InlineKeyboardBuilder()
-        builder.button(text="✅ Начать опрос", callback_data="start_survey")
-        
-        await message.answer(
-            "У вас пока нет психологического профиля. Чтобы создать его, нужно пройти опрос.",
-            reply_markup=builder.as_markup()
-        )
+    await _render_profile(message, state, from_callback=False)
 
 # Добавляем обработчик отмены опроса
 @survey_router.message(Command("cancel"))
@@ -984,7 +1050,6 @@ async def cancel_survey_command(message: Message, state: FSMContext):
         )
 
 # Обработчик кнопки возврата в главное меню
-@survey_router.callback_query(F.data == "main_menu")
 async def back_to_main_menu(callback: CallbackQuery, state: FSMContext):
     """
     Возвращает пользователя в главное меню.
@@ -1007,174 +1072,462 @@ async def back_to_main_menu(callback: CallbackQuery, state: FSMContext):
     
     # Отвечаем на callback
     await callback.answer("Возврат в главное меню")
-    logger.info(f"Пользователь {callback.from_user.id} вернулся в главное меню")
+    logger.info("Пользователь %s вернулся в главное меню", callback.from_user.id)
+
+# Справочники для генерации советов создаются один раз при импорте модуля
+# и используются всеми обработчиками без повторного построения
+
+# Тип личности по умолчанию, если переданный тип отсутствует в справочниках
+_DEFAULT_ADVICE_TYPE = "Интеллектуальный"
+
+# Стандартные советы для разных типов личности (fallback, если нет текста профиля)
+_FALLBACK_ADVICE: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": (
+        "🧠 Запланируйте 15-20 минут в день для чтения материалов по интересующей вас теме. Это поможет удовлетворить вашу потребность в интеллектуальном развитии.",
+        "🧩 Попробуйте метод «пяти почему» при анализе проблемы — задавайте вопрос «почему» пять раз подряд, чтобы докопаться до первопричины."
+    ),
+    "Эмоциональный": (
+        "📓 Практикуйте «эмоциональный дневник»: записывайте свои эмоции в течение дня и их триггеры. Это помогает лучше понимать свои чувства и реакции.",
+        "🧘 Используйте технику «дыхание 4-7-8»: вдох на 4 счета, задержка на 7, выдох на 8. Это эффективно снижает тревожность и помогает восстановить эмоциональный баланс."
+    ),
+    "Практический": (
+        "🐸 Используйте технику «ешьте лягушку»: начинайте день с самой сложной и неприятной задачи, и остальной день пройдет более продуктивно.",
+        "⏱️ Применяйте правило «двух минут»: если задача требует менее двух минут, сделайте ее сразу, не откладывая — это значительно сократит ваш список дел."
+    ),
+    "Творческий": (
+        "📝 Практикуйте «утренние страницы»: после пробуждения напишите три страницы текста без цензуры и редактирования. Это стимулирует творческое мышление.",
+        "🔄 Используйте технику «случайное слово»: выберите любое слово из словаря и попробуйте связать его с задачей, над которой работаете, чтобы найти новые идеи."
+    )
+}
+
+# Ключевые слова и фразы для поиска в профиле
+_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": (
+        "анализ", "логика", "мышление", "интеллект", "знания", 
+        "обучение", "информация", "понимание", "исследование", "концепции", 
+        "стратегическое мышление", "критическое мышление", "абстрактное мышление",
+        "когнитивные процессы", "рациональность", "любознательность"
+    ),
+    "Эмоциональный": (
+        "эмоции", "чувства", "эмпатия", "сопереживание", "отношения", 
+        "понимание других", "эмоциональный интеллект", "интуиция", "настроение", 
+        "гармония", "самосознание", "саморегуляция", "внутренний мир",
+        "эмоциональная глубина", "чувствительность", "психологическая гибкость"
+    ),
+    "Практический": (
+        "организация", "планирование", "эффективность", "результат", "действие", 
+        "дисциплина", "методичность", "пунктуальность", "продуктивность", "цели", 
+        "структура", "процессы", "упорядоченность", "последовательность", 
+        "практичность", "прагматизм", "конкретика"
+    ),
+    "Творческий": (
+        "творчество", "креативность", "воображение", "идеи", "инновации", 
+        "оригинальность", "интуиция", "вдохновение", "эстетика", "экспрессия", 
+        "искусство", "дизайн", "нестандартное мышление", "творческий потенциал",
+        "визуализация", "новаторство", "экспериментирование"
+    ),
+    "Аналитический тип": (
+        "анализ данных", "аналитика", "системный подход", "детали", "точность",
+        "структурирование", "классификация", "оценка", "закономерности", "алгоритмы",
+        "методология", "верификация", "сравнение", "измерение", "исследование",
+        "аргументация", "факты", "логические связи"
+    )
+}
+
+# Аспекты для разных типов личности
+_ASPECTS: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": (
+        "аналитическому мышлению", "обработке информации", "стратегическому планированию", 
+        "концептуальному мышлению", "поиску закономерностей", "систематизации знаний", 
+        "критическому анализу", "логическим рассуждениям", "глубокому пониманию", 
+        "абстрактному мышлению", "поиску связей между концепциями", "интеллектуальной любознательности"
+    ),
+    "Эмоциональный": (
+        "эмпатии", "эмоциональному восприятию", "чувственному опыту", 
+        "эмоциональному самоанализу", "глубоким переживаниям", "интуитивному пониманию", 
+        "эмоциональной осознанности", "сопереживанию", "построению глубоких отношений", 
+        "эмоциональной восприимчивости", "эмоциональному резонансу", "пониманию чувств других"
+    ),
+    "Практический": (
+        "организованности", "структурированию задач", "достижению конкретных результатов", 
+        "эффективному планированию", "практическому подходу", "детальному анализу", 
+        "последовательным действиям", "конкретным шагам", "организации процессов", 
+        "управлению ресурсами", "оптимизации деятельности", "доведению дел до конца"
+    ),
+    "Творческий": (
+        "нестандартному мышлению", "творческой свободе", "генерации новых идей", 
+        "креативному подходу", "образному мышлению", "творческой визуализации", 
+        "поиску уникальных решений", "эстетическому восприятию", "оригинальности", 
+        "творческому самовыражению", "инновационным подходам", "дивергентному мышлению"
+    ),
+    "Аналитический тип": (
+        "детальному анализу", "систематизации информации", "выявлению закономерностей",
+        "точной оценке данных", "методологическому подходу", "структурированию сложных проблем",
+        "последовательной аргументации", "построению логических моделей", "фактологическому анализу",
+        "исследовательскому мышлению", "категоризации", "точности формулировок"
+    )
+}
+
+# Аспекты вставляются в середину предложения, поэтому приводятся к нижнему
+# регистру один раз при загрузке модуля, а не при формировании каждого совета
+_ASPECTS_LOWER: Dict[str, Tuple[str, ...]] = {
+    type_name: tuple(aspect.lower() for aspect in type_aspects)
+    for type_name, type_aspects in _ASPECTS.items()
+}
+
+# Эмодзи для разных типов советов
+_EMOJI_MAP: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": ("🧠", "📚", "🔍", "🧩", "📝"),
+    "Эмоциональный": ("❤️", "🧘", "🙏", "🌱", "🫂"),
+    "Практический": ("⏱️", "✅", "📊", "🚫", "📋"),
+    "Творческий": ("🎨", "🔄", "🌈", "🧠", "🎭"),
+    "Аналитический тип": ("📊", "🔍", "📈", "🧮", "📋")
+}
+
+# Варианты начала фразы вместо "Учитывая вашу склонность к"
+_INTRO_PHRASES: Tuple[str, ...] = (
+    "Заметив ваше стремление к",
+    "Опираясь на ваш интерес к",
+    "Зная о вашей предрасположенности к",
+    "Принимая во внимание ваше тяготение к",
+    "Учитывая ваш потенциал в области",
+    "Исходя из вашей естественной тяги к",
+    "Основываясь на вашей сильной стороне -",
+    "Отмечая вашу склонность к",
+    "Наблюдая вашу направленность на",
+    "Видя ваше природное влечение к",
+    "Зная о вашей силе в сфере",
+    "Понимая важность для вас",
+    "Признавая вашу особую связь с",
+    "С учетом вашего таланта к",
+    "Отталкиваясь от вашего дара"
+)
+
+# Техники для разных типов личности
+_TECHNIQUES: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": (
+        "технику глубокого чтения", "метод интервального повторения", 
+        "технику создания ментальных карт", "метод Фейнмана", 
+        "технику активного вопрошания", "SQ3R метод для работы с текстами",
+        "технику поиска межпредметных связей", "дебаты с самим собой",
+        "технику ведения интеллектуального дневника", "метод соединения идей"
+    ),
+    "Эмоциональный": (
+        "практику осознанности", "технику эмоционального дистанцирования", 
+        "методику прогрессивной мышечной релаксации", "практику благодарности", 
+        "технику эмоционального картирования", "метод «заземления» эмоций",
+        "журнал эмоций", "практику сострадания к себе",
+        "технику эмоционального резонанса", "метод переключения эмоциональных состояний"
+    ),
+    "Практический": (
+        "систему Getting Things Done", "технику Помодоро", 
+        "метод «3-2-1»", "технику единой задачи", 
+        "блокирование времени", "правило двух минут",
+        "технику контекстных списков", "еженедельный обзор задач",
+        "метод PARA для организации информации", "технику выравнивания энергии"
+    ),
+    "Творческий": (
+        "технику случайных стимулов", "метод шести шляп", 
+        "технику творческих ограничений", "метод мозгового штурма наоборот", 
+        "практику творческих комбинаций", "метод синектики",
+        "технику 'что если'", "метод SCAMPER",
+        "технику дивергентного мышления", "метод случайных ассоциаций"
+    ),
+    "Аналитический тип": (
+        "технику декомпозиции сложных проблем", "метод SWOT-анализа", 
+        "технику критериального ранжирования", "методологию 5W1H", 
+        "технику последовательной декомпозиции", "прием проверки противоположных гипотез",
+        "технику анализа корневых причин", "метод систематической проверки фактов",
+        "прием построения причинно-следственных диаграмм", "метод ABC-анализа"
+    )
+}
+
+# Контексты применения для разных типов личности
+_CONTEXTS: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": (
+        "в процессе обучения новому", "при работе со сложной информацией", 
+        "при подготовке к важной презентации", "во время интеллектуального застоя", 
+        "для улучшения запоминания", "при анализе сложных проблем",
+        "для развития критического мышления", "при работе с абстрактными концепциями",
+        "для систематизации знаний", "при освоении новой области знаний"
+    ),
+    "Эмоциональный": (
+        "в стрессовых ситуациях", "при общении с сложными людьми", 
+        "когда вы чувствуете эмоциональное выгорание", "в моменты тревоги", 
+        "для улучшения отношений с близкими", "при эмоциональных перепадах",
+        "в ситуациях конфликта", "для усиления позитивных эмоций",
+        "во время важных переговоров", "в периоды эмоциональной нестабильности"
+    ),
+    "Практический": (
+        "при большом объеме задач", "в начале рабочего дня", 
+        "при работе над долгосрочными проектами", "когда чувствуете прокрастинацию", 
+        "при планировании сложных задач", "для повышения личной эффективности",
+        "при внедрении новых привычек", "при управлении несколькими проектами",
+        "для достижения баланса работы и отдыха", "при оптимизации рабочих процессов"
+    ),
+    "Творческий": (
+        "при работе над творческими проектами", "когда нужны нестандартные решения", 
+        "в моменты творческого блока", "при генерации новых идей", 
+        "для развития творческого мышления", "когда нужно преодолеть шаблонное мышление",
+        "для нахождения новых подходов к старым проблемам", "при разработке инноваций",
+        "в коллективном творческом процессе", "для расширения границ мышления"
+    ),
+    "Аналитический тип": (
+        "при анализе сложных данных", "когда нужно принять обоснованное решение", 
+        "при необходимости объективной оценки", "во время сбора и анализа информации", 
+        "для выявления скрытых закономерностей", "при разработке аналитических моделей",
+        "для построения прогнозов", "при валидации гипотез",
+        "в ситуациях, требующих точности и объективности", "при решении многофакторных задач"
+    )
+}
+
+# Результаты/цели для разных типов советов
+_RESULTS: Dict[str, Tuple[str, ...]] = {
+    "Интеллектуальный": (
+        "глубину понимания", "долгосрочное запоминание", 
+        "аналитические способности", "когнитивную гибкость", 
+        "критическое мышление", "способность к синтезу информации",
+        "интеллектуальную выносливость", "качество принимаемых решений",
+        "скорость обработки информации", "концептуальное мышление"
+    ),
+    "Эмоциональный": (
+        "эмоциональную устойчивость", "глубину эмпатии", 
+        "эмоциональный интеллект", "способность к самосостраданию", 
+        "качество отношений", "эмоциональное благополучие",
+        "способность к регуляции эмоций", "осознанность в отношениях",
+        "внутреннюю гармонию", "резилиентность"
+    ),
+    "Практический": (
+        "личную продуктивность", "эффективность рабочих процессов", 
+        "достижение целей", "управление временем", 
+        "жизненный баланс", "организационные навыки",
+        "способность доводить дела до конца", "качество результатов",
+        "стабильность рабочих привычек", "уверенность в принятии решений"
+    ),
+    "Творческий": (
+        "творческую продуктивность", "оригинальность идей", 
+        "способность к нестандартному мышлению", "инновационный потенциал", 
+        "творческую уверенность", "креативное решение проблем",
+        "гибкость мышления", "способность видеть возможности",
+        "творческую смелость", "расширение творческих горизонтов"
+    ),
+    "Аналитический тип": (
+        "точность анализа", "объективность суждений", 
+        "глубину исследования", "обоснованность выводов", 
+        "эффективность системного подхода", "способность выявлять закономерности",
+        "качество аналитических моделей", "методологическую точность",
+        "достоверность результатов", "способность к комплексной оценке"
+    )
+}
+
+# Варианты связок между частями совета
+_CONNECTIONS: Tuple[str, ...] = (
+    ", попробуйте", 
+    ", рекомендую применить", 
+    ", стоит освоить", 
+    ", будет полезно использовать",
+    ", можно практиковать",
+    ", эффективно применять",
+    ", хорошо работает",
+    ", поможет",
+    ", рассмотрите возможность использовать",
+    ", имеет смысл внедрить"
+)
+
+# Варианты связок для результата
+_RESULT_CONNECTIONS: Tuple[str, ...] = (
+    ", чтобы усилить", 
+    ", что улучшит", 
+    ", это развивает", 
+    ", так вы повысите",
+    ", это укрепит",
+    ", что положительно влияет на",
+    ", что поможет развить",
+    ", это благоприятно скажется на",
+    ", это способствует росту",
+    ", что углубляет"
+)
+
+# Варианты связок для контекста
+_CONTEXT_CONNECTIONS: Tuple[str, ...] = (
+    ". Это особенно полезно",
+    ". Данный подход эффективен",
+    ". Метод хорошо работает",
+    ". Практика наиболее ценна",
+    ". Такой подход даёт результаты",
+    ". Подобная техника особенно актуальна",
+    ". Стратегия показывает лучшие результаты",
+    ". Этот прием наиболее эффективен",
+    ". Рекомендация особенно актуальна",
+    ". Инструмент наиболее полезен"
+)
+
+# Обратный индекс ключевых слов: слово в нижнем регистре -> типы личности, к которым оно относится
+# (некоторые слова, например "интуиция", входят сразу в несколько типов)
+_KEYWORD_TO_TYPES: Dict[str, Tuple[str, ...]] = {}
+for _type_name, _type_keywords in _KEYWORDS.items():
+    for _keyword in _type_keywords:
+        _types = _KEYWORD_TO_TYPES.get(_keyword.lower(), ())
+        if _type_name not in _types:
+            _KEYWORD_TO_TYPES[_keyword.lower()] = _types + (_type_name,)
+del _type_name, _type_keywords, _keyword, _types
+_ALL_KEYWORDS_LOWER: Tuple[str, ...] = tuple(_KEYWORD_TO_TYPES)
+
+def _find_keywords(text_lower: str) -> List[str]:
+    """
+    Находит ключевые слова, которые встречаются в тексте профиля.
+    
+    Каждое ключевое слово (в нижнем регистре, без повторов) проверяется
+    поиском подстроки, который выполняется на C.
+    
+    Args:
+        text_lower: Текст профиля в нижнем регистре
+        
+    Returns:
+        List[str]: Найденные ключевые слова (каждое не более одного раза)
+    """
+    return [keyword for keyword in _ALL_KEYWORDS_LOWER if keyword in text_lower]
+
+def _profile_cache_key(profile_text: str, personality_type: str) -> str:
+    """
+    Вычисляет ключ кэша аспектов профиля.
+    
+    Используется blake2b, а не hash(): ключ сохраняется в хранилище FSM
+    и должен совпадать после перезапуска бота.
+    
+    Args:
+        profile_text: Текст профиля пользователя
+        personality_type: Тип личности пользователя
+        
+    Returns:
+        str: Ключ кэша
+    """
+    digest = hashlib.blake2b(profile_text.encode("utf-8"), digest_size=8)
+    digest.update(str(personality_type).encode("utf-8"))
+    return digest.hexdigest()
+
+def _cached_key_aspects(user_data: Dict[str, Any], profile_text: str,
+                        personality_type: str) -> Tuple[Optional[Tuple[str, ...]], Optional[Dict[str, Any]]]:
+    """
+    Возвращает ключевые аспекты профиля из кэша в состоянии FSM или вычисляет их заново.
+    
+    Профиль меняется только при повторном прохождении опроса, поэтому
+    аспекты, извлеченные для текущего текста профиля, можно переиспользовать.
+    
+    Args:
+        user_data: Данные пользователя из состояния FSM
+        profile_text: Текст профиля пользователя
+        personality_type: Тип личности пользователя
+        
+    Returns:
+        Tuple: Аспекты (None, если профиля нет) и новое значение кэша
+               для сохранения в состоянии (None, если кэш актуален)
+    """
+    if not profile_text:
+        return None, None
+    
+    key = _profile_cache_key(profile_text, personality_type)
+    cache = user_data.get("profile_aspects_cache") or {}
+    if cache.get("hash") == key:
+        return tuple(cache["aspects"]), None
+    
+    aspects = extract_key_aspects(profile_text, personality_type)
+    return aspects, {"hash": key, "aspects": list(aspects)}
+
+# Сколько последних советов помнить, чтобы не повторять их
+_ADVICE_HISTORY_SIZE = 20
+
+# Советы собираются из фраз без HTML, поэтому отправляются без разбора разметки:
+# жирный заголовок задается готовой сущностью (смещения считаются в UTF-16)
+_ADVICE_HEADER_PREFIX = "💡 "
+_ADVICE_HEADER_TITLE = "Персонализированный совет"
+_ADVICE_HEADER = f"{_ADVICE_HEADER_PREFIX}{_ADVICE_HEADER_TITLE}\n\n"
+# Вопрос о следующем действии идет в том же сообщении, что и совет с кнопками
+_ADVICE_FOOTER = "\n\nЧто вы хотите сделать дальше?"
+# Шаблон сообщения с советом собирается один раз: при отправке подставляется только совет
+_ADVICE_TEMPLATE = f"{_ADVICE_HEADER}%s{_ADVICE_FOOTER}"
+_ADVICE_ENTITIES = [
+    MessageEntity(
+        type="bold",
+        offset=len(_ADVICE_HEADER_PREFIX.encode("utf-16-le")) // 2,
+        length=len(_ADVICE_HEADER_TITLE.encode("utf-16-le")) // 2
+    )
+]
 
 # Функция для генерации персонализированных советов
-def get_personalized_advice(personality_type: str, profile_text: str = None, used_advices: list = None) -> str:
+def get_personalized_advice(personality_type: str, profile_text: str = None, used_advice_ids: Deque[int] = None,
+                            aspects: Optional[Tuple[str, ...]] = None, rng: Optional[random.Random] = None) -> str:
     """
     Генерирует персонализированный совет на основе профиля пользователя.
     
     Args:
         personality_type: Тип личности пользователя
         profile_text: Текст профиля пользователя
-        used_advices: Список уже использованных советов
-        
+        used_advice_ids: Номера уже выданных советов; номер нового совета добавляется в конец
+        aspects: Заранее извлеченные ключевые аспекты профиля (если есть в кэше)
+        rng: Генератор случайных чисел (по умолчанию создается новый)
+    
     Returns:
         str: Персонализированный совет
     """
+    if rng is None:
+        rng = random.Random()
+    
     # Если нет текста профиля, используем стандартные советы (fallback)
     if not profile_text:
         logger.warning("Текст профиля отсутствует, используем стандартные советы")
-        # Словарь с советами для разных типов личности (fallback)
-        advice_by_type = {
-            "Интеллектуальный": [
-                "🧠 Запланируйте 15-20 минут в день для чтения материалов по интересующей вас теме. Это поможет удовлетворить вашу потребность в интеллектуальном развитии.",
-                "🧩 Попробуйте метод «пяти почему» при анализе проблемы — задавайте вопрос «почему» пять раз подряд, чтобы докопаться до первопричины."
-            ],
-            "Эмоциональный": [
-                "📓 Практикуйте «эмоциональный дневник»: записывайте свои эмоции в течение дня и их триггеры. Это помогает лучше понимать свои чувства и реакции.",
-                "🧘 Используйте технику «дыхание 4-7-8»: вдох на 4 счета, задержка на 7, выдох на 8. Это эффективно снижает тревожность и помогает восстановить эмоциональный баланс."
-            ],
-            "Практический": [
-                "🐸 Используйте технику «ешьте лягушку»: начинайте день с самой сложной и неприятной задачи, и остальной день пройдет более продуктивно.",
-                "⏱️ Применяйте правило «двух минут»: если задача требует менее двух минут, сделайте ее сразу, не откладывая — это значительно сократит ваш список дел."
-            ],
-            "Творческий": [
-                "📝 Практикуйте «утренние страницы»: после пробуждения напишите три страницы текста без цензуры и редактирования. Это стимулирует творческое мышление.",
-                "🔄 Используйте технику «случайное слово»: выберите любое слово из словаря и попробуйте связать его с задачей, над которой работаете, чтобы найти новые идеи."
-            ]
-        }
         
         # Получаем список советов для данного типа личности
-        advice_list = advice_by_type.get(personality_type, advice_by_type["Интеллектуальный"])
+        advice_list = _FALLBACK_ADVICE.get(personality_type, _FALLBACK_ADVICE[_DEFAULT_ADVICE_TYPE])
         
         # Выбираем случайный совет
-        import random
-        advice = random.choice(advice_list)
+        advice = rng.choice(advice_list)
         
         # Логируем выбранный совет
-        logger.info(f"Выбран стандартный совет для типа личности {personality_type}")
+        logger.info("Выбран стандартный совет для типа личности %s", personality_type)
         
         return advice
     
     # Если есть текст профиля, генерируем уникальный совет
-    return generate_unique_advice(profile_text, personality_type, used_advices or [])
+    return generate_unique_advice(
+        profile_text, personality_type, used_advice_ids if used_advice_ids is not None else deque(), aspects, rng
+    )
 
-def extract_key_aspects(profile_text: str, personality_type: str) -> list:
+def extract_key_aspects(profile_text: str, personality_type: str) -> Tuple[str, ...]:
     """
     Извлекает ключевые аспекты из профиля пользователя.
     
     Args:
         profile_text: Текст профиля пользователя
         personality_type: Тип личности пользователя
-        
+    
     Returns:
-        list: Список ключевых аспектов
-    """
-    # Ключевые слова и фразы для поиска в профиле
-    keywords = {
-        "Интеллектуальный": [
-            "анализ", "логика", "мышление", "интеллект", "знания", 
-            "обучение", "информация", "понимание", "исследование", "концепции", 
-            "стратегическое мышление", "критическое мышление", "абстрактное мышление",
-            "когнитивные процессы", "рациональность", "любознательность"
-        ],
-        "Эмоциональный": [
-            "эмоции", "чувства", "эмпатия", "сопереживание", "отношения", 
-            "понимание других", "эмоциональный интеллект", "интуиция", "настроение", 
-            "гармония", "самосознание", "саморегуляция", "внутренний мир",
-            "эмоциональная глубина", "чувствительность", "психологическая гибкость"
-        ],
-        "Практический": [
-            "организация", "планирование", "эффективность", "результат", "действие", 
-            "дисциплина", "методичность", "пунктуальность", "продуктивность", "цели", 
-            "структура", "процессы", "упорядоченность", "последовательность", 
-            "практичность", "прагматизм", "конкретика"
-        ],
-        "Творческий": [
-            "творчество", "креативность", "воображение", "идеи", "инновации", 
-            "оригинальность", "интуиция", "вдохновение", "эстетика", "экспрессия", 
-            "искусство", "дизайн", "нестандартное мышление", "творческий потенциал",
-            "визуализация", "новаторство", "экспериментирование"
-        ],
-        "Аналитический тип": [
-            "анализ данных", "аналитика", "системный подход", "детали", "точность",
-            "структурирование", "классификация", "оценка", "закономерности", "алгоритмы",
-            "методология", "верификация", "сравнение", "измерение", "исследование",
-            "аргументация", "факты", "логические связи"
-        ]
-    }
-    
-    # Аспекты для разных типов личности
-    aspects = {
-        "Интеллектуальный": [
-            "аналитическому мышлению", "обработке информации", "стратегическому планированию", 
-            "концептуальному мышлению", "поиску закономерностей", "систематизации знаний", 
-            "критическому анализу", "логическим рассуждениям", "глубокому пониманию", 
-            "абстрактному мышлению", "поиску связей между концепциями", "интеллектуальной любознательности"
-        ],
-        "Эмоциональный": [
-            "эмпатии", "эмоциональному восприятию", "чувственному опыту", 
-            "эмоциональному самоанализу", "глубоким переживаниям", "интуитивному пониманию", 
-            "эмоциональной осознанности", "сопереживанию", "построению глубоких отношений", 
-            "эмоциональной восприимчивости", "эмоциональному резонансу", "пониманию чувств других"
-        ],
-        "Практический": [
-            "организованности", "структурированию задач", "достижению конкретных результатов", 
-            "эффективному планированию", "практическому подходу", "детальному анализу", 
-            "последовательным действиям", "конкретным шагам", "организации процессов", 
-            "управлению ресурсами", "оптимизации деятельности", "доведению дел до конца"
-        ],
-        "Творческий": [
-            "нестандартному мышлению", "творческой свободе", "генерации новых идей", 
-            "креативному подходу", "образному мышлению", "творческой визуализации", 
-            "поиску уникальных решений", "эстетическому восприятию", "оригинальности", 
-            "творческому самовыражению", "инновационным подходам", "дивергентному мышлению"
-        ],
-        "Аналитический тип": [
-            "детальному анализу", "систематизации информации", "выявлению закономерностей",
-            "точной оценке данных", "методологическому подходу", "структурированию сложных проблем",
-            "последовательной аргументации", "построению логических моделей", "фактологическому анализу",
-            "исследовательскому мышлению", "категоризации", "точности формулировок"
-        ]
-    }
-    
-    # Задаем дефолтный тип для случаев, когда переданный тип отсутствует в словаре
-    default_type = "Интеллектуальный"
+        Tuple[str, ...]: Ключевые аспекты (в нижнем регистре)
+    """
+    aspects = _ASPECTS_LOWER
+    default_type = _DEFAULT_ADVICE_TYPE
     
     # Логируем переданный тип личности
-    logger.info(f"Запрошены аспекты для типа личности: {personality_type}")
+    logger.info("Запрошены аспекты для типа личности: %s", personality_type)
     
-    # Найденные ключевые слова в профиле
-    found_keywords = []
-    
-    # Проверяем наличие ключевых слов для всех типов личности
-    all_keywords = []
-    for type_keywords in keywords.values():
-        all_keywords.extend(type_keywords)
-    
-    # Ищем ключевые слова в профиле
-    for keyword in all_keywords:
-        if keyword.lower() in profile_text.lower():
-            found_keywords.append(keyword)
+    # Ищем ключевые слова в профиле и считаем, к какому типу личности они относятся;
+    # счетчик заполняется в порядке _KEYWORDS, чтобы при равенстве побеждал первый тип
+    found_keywords = _find_keywords(profile_text.lower())
+    type_counts = Counter(dict.fromkeys(_KEYWORDS, 0))
+    for keyword in found_keywords:
+        for type_name in _KEYWORD_TO_TYPES[keyword]:
+            type_counts[type_name] += 1
     
     # Если нашли достаточно ключевых слов, используем соответствующие аспекты
     if found_keywords:
-        # Определяем, к какому типу личности относится большинство найденных ключевых слов
-        type_counts = {type_name: 0 for type_name in keywords.keys()}
-        for keyword in found_keywords:
-            for type_name, type_keywords in keywords.items():
-                if keyword.lower() in [k.lower() for k in type_keywords]:
-                    type_counts[type_name] += 1
-        
         # Определяем доминирующий тип на основе найденных ключевых слов
         dominant_type = max(type_counts.items(), key=lambda x: x[1])[0]
         
         # Проверяем, что оба типа личности (доминирующий и переданный) существуют в словаре аспектов
-        dominant_aspects = aspects.get(dominant_type, aspects.get(default_type, []))
+        dominant_aspects = aspects.get(dominant_type, aspects.get(default_type, ()))
         
         # Если переданный тип личности не существует в словаре аспектов, используем дефолтный
-        personality_aspects = aspects.get(personality_type, aspects.get(default_type, []))
+        personality_aspects = aspects.get(personality_type, aspects.get(default_type, ()))
         
         # Если доминирующий тип не совпадает с заявленным типом личности,
         # используем комбинацию аспектов обоих типов
@@ -1186,273 +1539,186 @@ def extract_key_aspects(profile_text: str, personality_type: str) -> list:
     
     # Если ключевые слова не найдены, возвращаем аспекты на основе типа личности
     # Используем .get() с дефолтным значением для безопасного получения аспектов
-    return aspects.get(personality_type, aspects.get(default_type, []))
+    return aspects.get(personality_type, aspects.get(default_type, ()))
+
+@lru_cache(maxsize=256)
+def _advice_components(personality_type: str,
+                       aspects: Tuple[str, ...]) -> Tuple[Tuple[Tuple[str, ...], ...], int]:
+    """
+    Собирает компоненты шаблона совета для типа личности и аспектов профиля.
+    
+    Набор компонентов зависит только от аргументов, поэтому для одного
+    профиля он собирается один раз на процесс, а при каждом нажатии
+    "Получить совет" выбирается лишь номер совета.
+    
+    Args:
+        personality_type: Тип личности пользователя
+        aspects: Ключевые аспекты профиля
+    
+    Returns:
+        Tuple: Компоненты в порядке шаблона и общее число вариантов совета
+    """
+    # Дефолтный тип личности для случаев, когда переданный тип не найден в справочниках
+    default_type = _DEFAULT_ADVICE_TYPE
+    
+    # Безопасно получаем списки с fallback на дефолтный тип
+    emoji_list = _EMOJI_MAP.get(personality_type, _EMOJI_MAP.get(default_type, ("💡",)))
+    technique_list = _TECHNIQUES.get(personality_type, _TECHNIQUES.get(default_type, ("практику саморазвития",)))
+    context_list = _CONTEXTS.get(personality_type, _CONTEXTS.get(default_type, ("в повседневной жизни",)))
+    result_list = _RESULTS.get(personality_type, _RESULTS.get(default_type, ("эффективность",)))
+    
+    # Компоненты совета в порядке шаблона. Каждый совет однозначно задается номером
+    # в декартовом произведении компонентов, поэтому проверка на повтор сводится
+    # к поиску номера во множестве, а не к сравнению строк с историей
+    components = (
+        emoji_list, _INTRO_PHRASES, aspects, _CONNECTIONS, technique_list,
+        _RESULT_CONNECTIONS, result_list, _CONTEXT_CONNECTIONS, context_list
+    )
+    return components, math.prod(len(options) for options in components)
 
-def generate_unique_advice(profile_text: str, personality_type: str, history: list) -> str:
+def _pick_advice(components: Tuple[Tuple[str, ...], ...], space: int,
+                 used_ids: Deque[int], rng: random.Random) -> str:
+    """
+    Выбирает еще не выданный совет и добавляет его номер в историю.
+    
+    Args:
+        components: Компоненты шаблона совета
+        space: Общее число вариантов совета
+        used_ids: Номера уже выданных советов
+        rng: Генератор случайных чисел
+    
+    Returns:
+        str: Текст совета
+    """
+    # Выбираем случайный номер совета, пропуская уже выданные. Пока история
+    # занимает меньше половины вариантов, ожидаемое число попыток меньше двух;
+    # для маленького набора вариантов выбираем сразу из списка свободных номеров
+    used = set(used_ids)
+    if 2 * len(used) < space:
+        advice_id = rng.randrange(space)
+        while advice_id in used:
+            advice_id = rng.randrange(space)
+    else:
+        free_ids = [i for i in range(space) if i not in used]
+        advice_id = rng.choice(free_ids) if free_ids else rng.randrange(space)
+    used_ids.append(advice_id)
+    
+    # Раскладываем номер совета на индексы компонентов
+    parts = []
+    rest = advice_id
+    for options in components:
+        rest, index = divmod(rest, len(options))
+        parts.append(options[index])
+    emoji, intro_phrase, aspect, connection, technique, result_connection, result, context_connection, context = parts
+    
+    # Формируем совет по динамическому шаблону
+    return f"{emoji} {intro_phrase} {aspect}{connection} {technique}{result_connection} {result}{context_connection} {context}."
+
+def generate_unique_advice(profile_text: str, personality_type: str, used_ids: Deque[int],
+                           aspects: Optional[Tuple[str, ...]] = None, rng: Optional[random.Random] = None) -> str:
     """
     Генерирует уникальный персонализированный совет на основе текста профиля.
     
     Args:
         profile_text: Текст профиля пользователя
         personality_type: Тип личности пользователя
-        history: Список уже использованных советов
-        
+        used_ids: Номера уже выданных советов; номер нового совета добавляется в конец
+        aspects: Заранее извлеченные ключевые аспекты профиля (если есть в кэше)
+        rng: Генератор случайных чисел (по умолчанию создается новый)
+    
     Returns:
         str: Уникальный персонализированный совет
     """
-    # Логируем процесс генерации
-    logger.info(f"Генерация уникального совета на основе профиля длиной {len(profile_text)} символов")
+    if rng is None:
+        rng = random.Random()
     
-    # Устанавливаем дефолтный тип личности для случаев, когда переданный тип не найден в словарях
-    default_type = "Интеллектуальный"
+    # Логируем процесс генерации
+    logger.info("Генерация уникального совета на основе профиля длиной %d символов", len(profile_text))
     
-    # Извлекаем ключевые аспекты из профиля
-    aspects = extract_key_aspects(profile_text, personality_type)
+    # Извлекаем ключевые аспекты из профиля, если они не переданы из кэша
+    if aspects is None:
+        aspects = extract_key_aspects(profile_text, personality_type)
     
     # Если аспекты не удалось извлечь, используем тип личности
     if not aspects:
-        aspects = ["саморазвитию"]  # Универсальный аспект как запасной вариант
-    
-    # Эмодзи для разных типов советов
-    emoji_map = {
-        "Интеллектуальный": ["🧠", "📚", "🔍", "🧩", "📝"],
-        "Эмоциональный": ["❤️", "🧘", "🙏", "🌱", "🫂"],
-        "Практический": ["⏱️", "✅", "📊", "🚫", "📋"],
-        "Творческий": ["🎨", "🔄", "🌈", "🧠", "🎭"],
-        "Аналитический тип": ["📊", "🔍", "📈", "🧮", "📋"]
-    }
-    
-    # Варианты начала фразы вместо "Учитывая вашу склонность к"
-    intro_phrases = [
-        "Заметив ваше стремление к",
-        "Опираясь на ваш интерес к",
-        "Зная о вашей предрасположенности к",
-        "Принимая во внимание ваше тяготение к",
-        "Учитывая ваш потенциал в области",
-        "Исходя из вашей естественной тяги к",
-        "Основываясь на вашей сильной стороне -",
-        "Отмечая вашу склонность к",
-        "Наблюдая вашу направленность на",
-        "Видя ваше природное влечение к",
-        "Зная о вашей силе в сфере",
-        "Понимая важность для вас",
-        "Признавая вашу особую связь с",
-        "С учетом вашего таланта к",
-        "Отталкиваясь от вашего дара"
-    ]
-    
-    # Выбираем случайный эмодзи на основе типа личности
-    import random
-    emoji_list = emoji_map.get(personality_type, emoji_map.get(default_type, ["💡"]))
-    emoji = random.choice(emoji_list)
-    
-    # Техники для разных типов личности
-    techniques = {
-        "Интеллектуальный": [
-            "технику глубокого чтения", "метод интервального повторения", 
-            "технику создания ментальных карт", "метод Фейнмана", 
-            "технику активного вопрошания", "SQ3R метод для работы с текстами",
-            "технику поиска межпредметных связей", "дебаты с самим собой",
-            "технику ведения интеллектуального дневника", "метод соединения идей"
-        ],
-        "Эмоциональный": [
-            "практику осознанности", "технику эмоционального дистанцирования", 
-            "методику прогрессивной мышечной релаксации", "практику благодарности", 
-            "технику эмоционального картирования", "метод «заземления» эмоций",
-            "журнал эмоций", "практику сострадания к себе",
-            "технику эмоционального резонанса", "метод переключения эмоциональных состояний"
-        ],
-        "Практический": [
-            "систему Getting Things Done", "технику Помодоро", 
-            "метод «3-2-1»", "технику единой задачи", 
-            "блокирование времени", "правило двух минут",
-            "технику контекстных списков", "еженедельный обзор задач",
-            "метод PARA для организации информации", "технику выравнивания энергии"
-        ],
-        "Творческий": [
-            "технику случайных стимулов", "метод шести шляп", 
-            "технику творческих ограничений", "метод мозгового штурма наоборот", 
-            "практику творческих комбинаций", "метод синектики",
-            "технику 'что если'", "метод SCAMPER",
-            "технику дивергентного мышления", "метод случайных ассоциаций"
-        ],
-        "Аналитический тип": [
-            "технику декомпозиции сложных проблем", "метод SWOT-анализа", 
-            "технику критериального ранжирования", "методологию 5W1H", 
-            "технику последовательной декомпозиции", "прием проверки противоположных гипотез",
-            "технику анализа корневых причин", "метод систематической проверки фактов",
-            "прием построения причинно-следственных диаграмм", "метод ABC-анализа"
-        ]
-    }
-    
-    # Контексты применения для разных типов личности
-    contexts = {
-        "Интеллектуальный": [
-            "в процессе обучения новому", "при работе со сложной информацией", 
-            "при подготовке к важной презентации", "во время интеллектуального застоя", 
-            "для улучшения запоминания", "при анализе сложных проблем",
-            "для развития критического мышления", "при работе с абстрактными концепциями",
-            "для систематизации знаний", "при освоении новой области знаний"
-        ],
-        "Эмоциональный": [
-            "в стрессовых ситуациях", "при общении с сложными людьми", 
-            "когда вы чувствуете эмоциональное выгорание", "в моменты тревоги", 
-            "для улучшения отношений с близкими", "при эмоциональных перепадах",
-            "в ситуациях конфликта", "для усиления позитивных эмоций",
-            "во время важных переговоров", "в периоды эмоциональной нестабильности"
-        ],
-        "Практический": [
-            "при большом объеме задач", "в начале рабочего дня", 
-            "при работе над долгосрочными проектами", "когда чувствуете прокрастинацию", 
-            "при планировании сложных задач", "для повышения личной эффективности",
-            "при внедрении новых привычек", "при управлении несколькими проектами",
-            "для достижения баланса работы и отдыха", "при оптимизации рабочих процессов"
-        ],
-        "Творческий": [
-            "при работе над творческими проектами", "когда нужны нестандартные решения", 
-            "в моменты творческого блока", "при генерации новых идей", 
-            "для развития творческого мышления", "когда нужно преодолеть шаблонное мышление",
-            "для нахождения новых подходов к старым проблемам", "при разработке инноваций",
-            "в коллективном творческом процессе", "для расширения границ мышления"
-        ],
-        "Аналитический тип": [
-            "при анализе сложных данных", "когда нужно принять обоснованное решение", 
-            "при необходимости объективной оценки", "во время сбора и анализа информации", 
-            "для выявления скрытых закономерностей", "при разработке аналитических моделей",
-            "для построения прогнозов", "при валидации гипотез",
-            "в ситуациях, требующих точности и объективности", "при решении многофакторных задач"
-        ]
-    }
-    
-    # Результаты/цели для разных типов советов
-    results = {
-        "Интеллектуальный": [
-            "глубину понимания", "долгосрочное запоминание", 
-            "аналитические способности", "когнитивную гибкость", 
-            "критическое мышление", "способность к синтезу информации",
-            "интеллектуальную выносливость", "качество принимаемых решений",
-            "скорость обработки информации", "концептуальное мышление"
-        ],
-        "Эмоциональный": [
-            "эмоциональную устойчивость", "глубину эмпатии", 
-            "эмоциональный интеллект", "способность к самосостраданию", 
-            "качество отношений", "эмоциональное благополучие",
-            "способность к регуляции эмоций", "осознанность в отношениях",
-            "внутреннюю гармонию", "резилиентность"
-        ],
-        "Практический": [
-            "личную продуктивность", "эффективность рабочих процессов", 
-            "достижение целей", "управление временем", 
-            "жизненный баланс", "организационные навыки",
-            "способность доводить дела до конца", "качество результатов",
-            "стабильность рабочих привычек", "уверенность в принятии решений"
-        ],
-        "Творческий": [
-            "творческую продуктивность", "оригинальность идей", 
-            "способность к нестандартному мышлению", "инновационный потенциал", 
-            "творческую уверенность", "креативное решение проблем",
-            "гибкость мышления", "способность видеть возможности",
-            "творческую смелость", "расширение творческих горизонтов"
-        ],
-        "Аналитический тип": [
-            "точность анализа", "объективность суждений", 
-            "глубину исследования", "обоснованность выводов", 
-            "эффективность системного подхода", "способность выявлять закономерности",
-            "качество аналитических моделей", "методологическую точность",
-            "достоверность результатов", "способность к комплексной оценке"
-        ]
-    }
-    
-    # Варианты связок между частями совета
-    connections = [
-        ", попробуйте", 
-        ", рекомендую применить", 
-        ", стоит освоить", 
-        ", будет полезно использовать",
-        ", можно практиковать",
-        ", эффективно применять",
-        ", хорошо работает",
-        ", поможет",
-        ", рассмотрите возможность использовать",
-        ", имеет смысл внедрить"
-    ]
-    
-    # Варианты связок для результата
-    result_connections = [
-        ", чтобы усилить", 
-        ", что улучшит", 
-        ", это развивает", 
-        ", так вы повысите",
-        ", это укрепит",
-        ", что положительно влияет на",
-        ", что поможет развить",
-        ", это благоприятно скажется на",
-        ", это способствует росту",
-        ", что углубляет"
-    ]
-    
-    # Варианты связок для контекста
-    context_connections = [
-        ". Это особенно полезно",
-        ". Данный подход эффективен",
-        ". Метод хорошо работает",
-        ". Практика наиболее ценна",
-        ". Такой подход даёт результаты",
-        ". Подобная техника особенно актуальна",
-        ". Стратегия показывает лучшие результаты",
-        ". Этот прием наиболее эффективен",
-        ". Рекомендация особенно актуальна",
-        ". Инструмент наиболее полезен"
-    ]
-    
-    # Выбираем ключевой аспект, технику и контекст с использованием .get() для безопасности
-    aspect = random.choice(aspects)
-    
-    # Безопасно получаем списки с fallback на дефолтный тип
-    technique_list = techniques.get(personality_type, techniques.get(default_type, ["практику саморазвития"]))
-    technique = random.choice(technique_list)
+        aspects = ("саморазвитию",)  # Универсальный аспект как запасной вариант
     
-    context_list = contexts.get(personality_type, contexts.get(default_type, ["в повседневной жизни"]))
-    context = random.choice(context_list)
+    # Компоненты шаблона берутся из кэша процесса, выбирается только номер совета
+    components, space = _advice_components(personality_type, tuple(aspects))
+    advice = _pick_advice(components, space, used_ids, rng)
     
-    result_list = results.get(personality_type, results.get(default_type, ["эффективность"]))
-    result = random.choice(result_list)
+    # Логируем сгенерированный совет (%.50s обрезает строку только при записи в лог)
+    logger.info("Сгенерирован уникальный совет: %.50s...", advice)
     
-    # Выбираем случайную фразу для начала совета
-    intro_phrase = random.choice(intro_phrases)
+    return advice
+
+# Ограничение частоты советов на пользователя (token bucket): до _ADVICE_BURST
+# советов подряд, затем один новый совет каждые _ADVICE_REFILL_SECONDS секунд
+_ADVICE_BURST = 2
+_ADVICE_REFILL_SECONDS = 3.0
+_ADVICE_BUCKETS_LIMIT = 10000
+_advice_buckets: Dict[int, Tuple[float, float]] = {}
+
+def _take_advice_token(user_id: int) -> bool:
+    """
+    Списывает один совет из лимита пользователя.
     
-    # Выбираем связки между частями совета
-    connection = random.choice(connections)
-    result_connection = random.choice(result_connections)
-    context_connection = random.choice(context_connections)
+    Бакеты хранятся в памяти процесса; заполненные бакеты неактивных
+    пользователей удаляются, когда их число превышает _ADVICE_BUCKETS_LIMIT.
     
-    # Формируем совет по динамическому шаблону
-    advice = f"{emoji} {intro_phrase} {aspect.lower()}{connection} {technique}{result_connection} {result}{context_connection} {context}."
-    
-    # Проверяем, что совет уникален (не повторяется с предыдущими)
-    attempts = 0
-    while advice in history and attempts < 5:
-        # Если совет уже использовался, генерируем новый с другими компонентами
-        aspect = random.choice(aspects)
-        technique = random.choice(technique_list)
-        context = random.choice(context_list)
-        result = random.choice(result_list)
-        emoji = random.choice(emoji_list)
-        intro_phrase = random.choice(intro_phrases)
-        connection = random.choice(connections)
-        result_connection = random.choice(result_connections)
-        context_connection = random.choice(context_connections)
+    Args:
+        user_id: ID пользователя Telegram
         
-        advice = f"{emoji} {intro_phrase} {aspect.lower()}{connection} {technique}{result_connection} {result}{context_connection} {context}."
-        attempts += 1
+    Returns:
+        bool: True, если совет можно выдать сейчас
+    """
+    now = time.monotonic()
+    tokens, updated_at = _advice_buckets.get(user_id, (_ADVICE_BURST, now))
+    tokens = min(_ADVICE_BURST, tokens + (now - updated_at) / _ADVICE_REFILL_SECONDS)
+    if tokens < 1:
+        _advice_buckets[user_id] = (tokens, now)
+        return False
+    
+    if user_id not in _advice_buckets and len(_advice_buckets) >= _ADVICE_BUCKETS_LIMIT:
+        full_after = _ADVICE_BURST * _ADVICE_REFILL_SECONDS
+        for stale_id in [uid for uid, (_, at) in _advice_buckets.items() if now - at >= full_after]:
+            del _advice_buckets[stale_id]
+    _advice_buckets[user_id] = (tokens - 1, now)
+    return True
+
+async def _next_advice(state: FSMContext, user_data: Dict[str, Any], user_id: int) -> str:
+    """
+    Выбирает следующий совет для пользователя и сохраняет историю советов.
     
-    # Логируем сгенерированный совет
-    logger.info(f"Сгенерирован уникальный совет: {advice[:50]}...")
+    Args:
+        state: Состояние FSM
+        user_data: Уже прочитанные данные пользователя
+        user_id: ID пользователя Telegram
     
+    Returns:
+        str: Текст совета
+    """
+    personality_type = user_data.get("personality_type", "Интеллектуальный")
+    profile_text = _profile_text(user_data)
+    # История хранится в ограниченной очереди: старые записи вытесняются автоматически
+    used_advice_hashes = deque(user_data.get("used_advice_hashes", []), maxlen=_ADVICE_HISTORY_SIZE)
+    aspects, aspects_cache = _cached_key_aspects(user_data, profile_text, personality_type)
+    
+    # Отдельный генератор на вызов, без общей блокировки модуля random
+    rng = random.Random(user_id ^ time.monotonic_ns())
+    advice = get_personalized_advice(personality_type, profile_text, used_advice_hashes, aspects, rng)
+    
+    # Сохраняем номер совета в историю (хранилище FSM сериализует данные в JSON, поэтому списками);
+    # список текстов used_advices больше не ведется и очищается у старых состояний
+    updates = {"used_advice_hashes": list(used_advice_hashes)}
+    if user_data.get("used_advices"):
+        updates["used_advices"] = []
+    if aspects_cache is not None:
+        updates["profile_aspects_cache"] = aspects_cache
+    await state.update_data(updates)
     return advice
 
 # Обработчик для callback "get_advice"
-@survey_router.callback_query(F.data == "get_advice")
 async def get_advice_callback(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик для получения совета через callback.
@@ -1461,47 +1727,31 @@ async def get_advice_callback(callback: CallbackQuery, state: FSMContext):
         callback: Callback query
         state: Состояние FSM
     """
-    # Показываем индикатор "печатает..."
-    await callback.message.bot.send_chat_action(chat_id=callback.message.chat.id, action="typing")
-    
-    # Получаем данные пользователя
-    user_data = await state.get_data()
-    personality_type = user_data.get("personality_type", "Интеллектуальный")
-    profile_details = user_data.get("profile_details", "")
-    used_advices = user_data.get("used_advices", [])
-    
-    # Получаем персонализированный совет
-    advice = get_personalized_advice(personality_type, profile_details, used_advices)
-    
-    # Сохраняем совет в историю
-    used_advices.append(advice)
-    # Ограничиваем историю последними 20 советами
-    if len(used_advices) > 20:
-        used_advices = used_advices[-20:]
-    await state.update_data(used_advices=used_advices)
+    # Частые повторные нажатия получают только всплывающий ответ на callback,
+    # не расходуя общий лимит бота на отправку сообщений
+    if not _take_advice_token(callback.from_user.id):
+        await callback.answer("Подождите несколько секунд…")
+        return
     
-    # Отправляем совет
-    await callback.message.answer(
-        f"💡 <b>Персонализированный совет</b>\n\n{advice}",
-        parse_mode="HTML"
-    )
+    # Показываем индикатор "печатает..." в фоне, пока читаем состояние; индикатор
+    # дожидается до записи совета в историю, чтобы его ошибка не оставила
+    # выданным совет, который так и не был отправлен
+    typing_task = _start_typing(callback.message)
+    try:
+        # Получаем данные пользователя
+        user_data = await state.get_data()
+    finally:
+        await _finish_typing(typing_task)
     
-    # Добавляем кнопки для дополнительных действий
-    builder = InlineKeyboardBuilder()
-    builder.button(text="🔄 Получить другой совет", callback_data="get_advice")
-    builder.button(text="👤 Посмотреть профиль", callback_data="view_profile")
-    builder.button(text="◀️ Главное меню", callback_data="main_menu")
-    builder.adjust(1)
+    # Получаем персонализированный совет и записываем его в историю
+    advice = await _next_advice(state, user_data, callback.from_user.id)
     
+    # Отправляем совет одним сообщением вместе с кнопками дополнительных действий
     await callback.message.answer(
-        "Что вы хотите сделать дальше?",
-        reply_markup=builder.as_markup()
-    )
-    
-    # Возвращаем основную клавиатуру
-    await callback.message.answer(
-        "⬅️ Вернуться в главное меню",
-        reply_markup=get_main_keyboard()
+        _ADVICE_TEMPLATE % advice,
+        parse_mode=None,
+        entities=_ADVICE_ENTITIES,
+        reply_markup=_ADVICE_FOLLOWUP_MARKUP
     )
     
     # Отвечаем на callback
@@ -1523,50 +1773,24 @@ async def command_advice(message: Message, state: FSMContext):
     profile_completed = user_data.get("profile_completed", False)
     
     if profile_completed:
-        # Если профиль есть, получаем тип личности и детали профиля
-        personality_type = user_data.get("personality_type", "Интеллектуальный")
-        profile_details = user_data.get("profile_details", "")
-        used_advices = user_data.get("used_advices", [])
-        
-        # Получаем персонализированный совет на основе типа личности и профиля
-        advice = get_personalized_advice(personality_type, profile_details, used_advices)
-        
-        # Сохраняем совет в историю
-        used_advices.append(advice)
-        # Ограничиваем историю последними 20 советами
-        if len(used_advices) > 20:
-            used_advices = used_advices[-20:]
-        await state.update_data(used_advices=used_advices)
-        
-        # Отправляем совет
-        await message.answer(
-            f"💡 <b>Персонализированный совет</b>\n\n{advice}",
-            parse_mode="HTML"
-        )
-        
-        # Добавляем кнопки для дополнительных действий
-        builder = InlineKeyboardBuilder()
-        builder.button(text="🔄 Получить другой совет", callback_data="get_advice")
-        builder.button(text="👤 Посмотреть профиль", callback_data="view_profile")
-        builder.button(text="◀️ Главное меню", callback_data="main_menu")
-        builder.adjust(1)
+        # Если профиль есть, получаем совет на основе типа личности и профиля
+        advice = await _next_advice(state, user_data, message.from_user.id)
         
+        # Отправляем совет одним сообщением вместе с кнопками дополнительных действий
         await message.answer(
-            "Что вы хотите сделать дальше?",
-            reply_markup=builder.as_markup()
+            _ADVICE_TEMPLATE % advice,
+            parse_mode=None,
+            entities=_ADVICE_ENTITIES,
+            reply_markup=_ADVICE_FOLLOWUP_MARKUP
         )
     else:
         # Если профиля нет, предлагаем пройти опрос
-        builder = InlineKeyboardBuilder()
-        builder.button(text="✅ Начать опрос", callback_data="start_survey")
-        
         await message.answer(
             "Чтобы получать персонализированные советы, необходимо сначала пройти психологический тест и создать ваш профиль.",
-            reply_markup=builder.as_markup()
+            reply_markup=_START_SURVEY_MARKUP
         )
 
 # Добавляем обработчик для callback "start_survey"
-@survey_router.callback_query(F.data == "start_survey")
 async def start_survey_callback(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик для начала опроса через callback.
@@ -1575,32 +1799,55 @@ async def start_survey_callback(callback: CallbackQuery, state: FSMContext):
         callback: Callback query
         state: Состояние FSM
     """
-    await callback.message.delete()
-    await start_survey(callback.message, state)
+    # Сразу отвечаем на callback, чтобы Telegram убрал индикатор загрузки,
+    # а сообщение с кнопкой удаляем параллельно с отправкой первого вопроса
     await callback.answer("Начинаем опрос")
+    _delete_in_background(callback.message)
+    await start_survey(callback.message, state)
+
+# Таблица обработчиков callback-запросов опроса: callback_data -> обработчик
+_CB: Dict[str, Callable[[CallbackQuery, FSMContext], Awaitable[None]]] = {
+    "confirm_survey": confirm_restart_survey,
+    "cancel_survey": cancel_restart_survey,
+    "restart_survey": restart_survey,
+    "confirm_profile_reset": confirm_profile_reset,
+    "cancel_profile_reset": cancel_profile_reset,
+    "show_details": show_profile_details,
+    "view_profile": view_profile_callback,
+    "main_menu": back_to_main_menu,
+    "get_advice": get_advice_callback,
+    "start_survey": start_survey_callback,
+}
+
+# Единый обработчик callback-запросов опроса вместо отдельного фильтра на каждый callback_data
+@survey_router.callback_query(F.data.in_(set(_CB)))
+async def survey_callback_dispatcher(callback: CallbackQuery, state: FSMContext):
+    """
+    Передает callback-запрос обработчику из таблицы _CB.
+    
+    Args:
+        callback: Callback query
+        state: Состояние FSM
+    """
+    await _CB[callback.data](callback, state)
 
 # Добавляем функцию для тестирования интерпретаций ответов
-async def test_interpretations():
+def test_interpretations():
     """
     Тестовая функция для проверки работы интерпретаций ответов.
     """
-    from questions import get_all_vasini_questions
-    
-    # Получаем списки вопросов
-    vasini_questions = get_all_vasini_questions()
-    
     # Выбираем первый вопрос для теста
-    test_question = vasini_questions[0]
-    print(f"Тестовый вопрос: {test_question['text']}")
+    test_question = _VASINI_QUESTIONS[0]
+    print(f"Тестовый вопрос: {test_question.text}")
     
     # Выводим варианты ответов
-    for option, text in test_question['options'].items():
+    for option, text in test_question.options.items():
         print(f"{option}: {text}")
     
     # Тестируем получение интерпретации для варианта A
     option = "A"
     try:
-        interpretation = test_question["interpretations"][option]
+        interpretation = test_question.interpretations[option]
         print(f"\nИнтерпретация для варианта {option}:\n{interpretation}")
         print("\nПроверка успешна! Интерпретации работают корректно.")
     except Exception as e:
@@ -1608,5 +1855,4 @@ async def test_interpretations():
 
 # Добавляем в конец файла для запуска теста при прямом вызове
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(test_interpretations()) 
\ No newline at end of file
+    test_interpretations() 
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Тест компактного хранения ответов опроса в состоянии FSM.
+"""
+
+import random
+
+from questions import (
+    DEMO_QUESTIONS, VASINI_QUESTIONS, VASINI_OPTIONS, VASINI_OPTION_CODES,
+    pack_answers, unpack_answers, answers_to_dict, get_personality_type_from_answers
+)
+
+def _sample_answers(seed: int):
+    """Возвращает случайные ответы в компактном и в старом словарном формате."""
+    rng = random.Random(seed)
+    demo_answers = {question["id"]: f"ответ {i}" for i, question in enumerate(DEMO_QUESTIONS)}
+    vasini_answers = bytearray(VASINI_OPTION_CODES[rng.choice(VASINI_OPTIONS)] for _ in VASINI_QUESTIONS)
+    legacy = dict(demo_answers)
+    for question, code in zip(VASINI_QUESTIONS, vasini_answers):
+        legacy[question.id] = VASINI_OPTIONS[code]
+    return demo_answers, vasini_answers, legacy
+
+def test_packed_round_trip():
+    """Проверяет, что упаковка и распаковка ответов ничего не теряет."""
+    for seed in range(20):
+        demo_answers, vasini_answers, legacy = _sample_answers(seed)
+        packed = pack_answers(demo_answers, vasini_answers)
+
+        assert unpack_answers(packed) == (demo_answers, vasini_answers)
+        assert answers_to_dict(packed) == legacy
+        # Старый словарный формат распаковывается в тот же буфер
+        assert unpack_answers(legacy) == (demo_answers, vasini_answers)
+        assert answers_to_dict(legacy) == legacy
+    print("✅ Ответы одинаково восстанавливаются из обоих форматов.")
+
+def test_partial_answers():
+    """Проверяет ответы, сохраненные посреди опроса."""
+    demo_answers, vasini_answers, _ = _sample_answers(0)
+    partial = pack_answers(demo_answers, vasini_answers[:5])
+
+    restored_demo, restored_vasini = unpack_answers(partial)
+    assert restored_demo == demo_answers
+    assert len(restored_vasini) == len(VASINI_QUESTIONS)
+    assert restored_vasini[:5] == vasini_answers[:5]
+
+    answered = answers_to_dict(partial)
+    assert [question.id for question in VASINI_QUESTIONS if question.id in answered] == \
+        [question.id for question in VASINI_QUESTIONS[:5]]
+    assert unpack_answers(None)[0] == {} and unpack_answers({})[0] == {}
+    print("✅ Частично заполненные ответы распаковываются корректно.")
+
+def test_personality_type_same_for_both_formats():
+    """Проверяет, что тип личности не зависит от формата хранения ответов."""
+    for seed in range(20):
+        demo_answers, vasini_answers, legacy = _sample_answers(seed)
+        packed = pack_answers(demo_answers, vasini_answers)
+        assert get_personality_type_from_answers(packed) == get_personality_type_from_answers(legacy)
+    print("✅ Тип личности совпадает для компактного и словарного формата.")
+
+if __name__ == "__main__":
+    print("Запуск теста хранения ответов...")
+    test_packed_round_trip()
+    test_partial_answers()
+    test_personality_type_same_for_both_formats()
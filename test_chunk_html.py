@@ -0,0 +1,117 @@
+"""
+Тест разбиения длинного HTML-текста на сообщения Telegram.
+"""
+
+import re
+
+from survey_handler import _chunk_html
+
+LIMIT = 300
+
+_TAG_RE = re.compile(r'<(/?)(b|a)\b[^>]*>')
+_ENTITY_RE = re.compile(r'&[a-z]+;')
+
+def _check_balanced(part: str):
+    """Проверяет, что теги <b> и <a> в части правильно вложены и закрыты."""
+    stack = []
+    for match in _TAG_RE.finditer(part):
+        if match.group(1):
+            assert stack and stack[-1] == match.group(2), f"Лишний закрывающий тег в части: {part!r}"
+            stack.pop()
+        else:
+            stack.append(match.group(2))
+    assert not stack, f"Незакрытые теги {stack} в части: {part!r}"
+
+def _strip_tags(text: str) -> str:
+    """Удаляет теги <b> и <a>, оставляя видимый текст."""
+    return _TAG_RE.sub('', text)
+
+def _check_parts(text: str, parts):
+    """Общие проверки: длина частей, баланс тегов и сохранность видимого текста."""
+    assert parts, "Пустой результат для непустого текста"
+    for part in parts:
+        assert len(part) <= LIMIT, f"Часть длиной {len(part)} превышает лимит {LIMIT}"
+        _check_balanced(part)
+    assert ''.join(_strip_tags(part) for part in parts) == _strip_tags(text)
+
+def test_short_text():
+    """Проверяет, что короткий и пустой текст не разбиваются."""
+    assert _chunk_html("<b>Профиль</b>", LIMIT) == ["<b>Профиль</b>"]
+    assert _chunk_html("", LIMIT) == []
+    print("✅ Короткий текст отправляется одним сообщением.")
+
+def test_bold_paragraphs():
+    """Проверяет разбиение текста из абзацев с жирными заголовками."""
+    text = "\n\n".join(
+        f"<b>Раздел {i}</b>\n" + " ".join(f"слово{j}" for j in range(30))
+        for i in range(10)
+    )
+    parts = _chunk_html(text, LIMIT)
+    assert len(parts) > 1
+    _check_parts(text, parts)
+    print(f"✅ Абзацы с <b> разбиты на {len(parts)} частей.")
+
+def test_bold_reopened_across_cut():
+    """Проверяет, что тег <b>, пересекающий разрез, закрывается и открывается заново."""
+    text = "<b>" + " ".join(f"жирное{j}" for j in range(120)) + "</b> хвост"
+    parts = _chunk_html(text, LIMIT)
+    assert len(parts) > 1
+    _check_parts(text, parts)
+    for part in parts[:-1]:
+        assert part.endswith("</b>"), f"Тег не закрыт в конце части: {part!r}"
+    for part in parts[1:]:
+        assert part.startswith("<b>"), f"Тег не открыт в начале части: {part!r}"
+    print("✅ Тег <b> переоткрывается в каждой следующей части.")
+
+def test_links_reopened_across_cut():
+    """Проверяет ссылки <a href>, в том числе разрезанные посередине текста ссылки."""
+    href = '<a href="https://example.com/path?x=1&amp;y=2">'
+    text = " ".join(
+        f"{href}ссылка {i} с длинным текстом внутри</a> и обычный текст"
+        for i in range(20)
+    )
+    text += " " + href + " ".join(f"длинная{j}" for j in range(80)) + "</a>"
+    parts = _chunk_html(text, LIMIT)
+    assert len(parts) > 1
+    _check_parts(text, parts)
+    for part in parts:
+        # Тег <a ...> не разрезан: каждое "<a" в части завершается ">"
+        for match in re.finditer(r'<a\b', part):
+            assert part.find('>', match.start()) != -1
+    assert parts[-1].startswith(href), "Ссылка не открыта заново в последней части"
+    print("✅ Ссылки <a href> не разрезаются и переоткрываются.")
+
+def test_entities_not_cut():
+    """Проверяет, что разрез не попадает внутрь HTML-сущности &amp;."""
+    for shift in range(12):
+        text = "x" * shift + "&amp;" * 200
+        parts = _chunk_html(text, LIMIT)
+        _check_parts(text, parts)
+        for part in parts:
+            # Без сущностей в части не должно остаться ни одного "&" или ";"
+            rest = _ENTITY_RE.sub('', part)
+            assert '&' not in rest and ';' not in rest, f"Сущность разрезана в части: {part!r}"
+    print("✅ Сущности &amp; не разрезаются.")
+
+def test_unbroken_text():
+    """Проверяет текст без пробелов и переносов длиннее лимита."""
+    text = "я" * (LIMIT * 3 + 17)
+    parts = _chunk_html(text, LIMIT)
+    assert len(parts) > 1
+    for part in parts:
+        assert len(part) <= LIMIT
+    assert ''.join(parts) == text
+
+    bold = "<b>" + text + "</b>"
+    parts = _chunk_html(bold, LIMIT)
+    _check_parts(bold, parts)
+    print("✅ Текст без пробелов режется по лимиту без потерь.")
+
+if __name__ == "__main__":
+    print("Запуск теста разбиения HTML...")
+    test_short_text()
+    test_bold_paragraphs()
+    test_bold_reopened_across_cut()
+    test_links_reopened_across_cut()
+    test_entities_not_cut()
+    test_unbroken_text()
@@ -2,10 +2,9 @@
 Тестовый скрипт для проверки функциональности интерпретаций ответов в опроснике.
 """
 
-import asyncio
 from typing import Dict, Any
 
-async def test_interpretations():
+def test_interpretations():
     """
     Тестовая функция для проверки работы интерпретаций ответов.
     """
@@ -37,4 +36,4 @@ async def test_interpretations():
 
 if __name__ == "__main__":
     print("Запуск тестирования интерпретаций вопросов...")
-    asyncio.run(test_interpretations()) 
\ No newline at end of file
+    test_interpretations() 
\ No newline at end of file